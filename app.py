@@ -2,25 +2,99 @@ import eventlet
 eventlet.monkey_patch()
 
 import os
+import functools
+import heapq
+import json
 import math
 import random
+import signal
 import time
 import uuid
-from collections import defaultdict
+from collections import OrderedDict, defaultdict, deque
+from itertools import islice
+from contextlib import contextmanager
 from threading import Lock
 
-from flask import Flask, request
+from eventlet import tpool
+from flask import Flask, Response, jsonify, request
 from flask_socketio import SocketIO, emit, join_room, leave_room
 
+import bots
+import encoding
+import metrics
+import persistence
+from cluster import Cluster
+from codes import CodeSpaceExhausted, LobbyCodeAllocator
+from encoding import EncodedPayload, SplicedPayload
+from models import Lobby, Player
+from profiler import SamplingProfiler
+from ratelimit import EventLimits
+from rules import DUPLICATE_PENALTY, resolve_round, target_from_total
+
 
 app = Flask(__name__, static_folder="static", static_url_path="")
 app.config["SECRET_KEY"] = "balance-scale-secret"
-socketio = SocketIO(app, async_mode="eventlet", cors_allowed_origins="*")
-
-
-lobbies = {}
-lobbies_lock = Lock()
+cluster = Cluster(
+    os.environ.get("CLUSTER_BACKEND", "memory://"),
+    worker_count=int(os.environ.get("CLUSTER_WORKERS", 1)),
+    worker_index=int(os.environ.get("CLUSTER_WORKER_INDEX", 0)),
+)
+socketio = SocketIO(
+    app,
+    async_mode="eventlet",
+    cors_allowed_origins="*",
+    json=encoding,
+    **cluster.socketio_options(),
+)
+# Off unless PROFILE_ENABLED=1; SIGUSR2 toggles it, and turning it off writes
+# PROFILE_OUTPUT (collapsed stacks) and PROFILE_OUTPUT.calls (per-call times).
+sampling_profiler = SamplingProfiler(
+    os.environ.get("PROFILE_OUTPUT", "profile.collapsed"),
+    sample_rate=float(os.environ.get("PROFILE_SAMPLE_RATE", 0.01)),
+)
+
+
+# Least recently used first: get_lobby() moves a lobby to the end.
+lobbies = OrderedDict()
+# sid -> lobby_id for every connected player, so lookups never scan lobbies.
+session_lobbies = {}
+# Guards ``lobbies`` and ``session_lobbies`` only. Always taken last: never
+# acquire a lobby's own lock while holding it.
+lobbies_lock = metrics.TimedLock(
+    Lock(), metrics.LOBBIES_LOCK_WAIT_SECONDS, metrics.LOBBIES_LOCK_HOLD_SECONDS
+)
+# Broadcast requests folded into an already pending flush, by event name.
+coalesced_emits = defaultdict(int)
+# Handlers registered with lobby_event(), by event name, for forwarded events;
+# called as handler(data, lobby_id) with the lobby's rate limit applied.
+lobby_handlers = {}
+# Heap of (monotonic due time, lobby_id, round) shared by every lobby. Entries
+# for rounds that already ended are skipped when they come due.
+round_deadlines = []
+round_timer_started = False
+# Heap of (monotonic due time, lobby_id, round, bot_id) drained by one greenlet.
+bot_turns = []
+bot_scheduler_started = False
+# Heap of (monotonic due time, lobby_id, sid) for detached players. Entries
+# for players that resumed or left in the meantime are skipped.
+resume_deadlines = []
+resume_timer_started = False
+# lobby_id -> sids whose outbound queue was at SLOW_CONSUMER_BACKLOG at the
+# last check_consumers() pass.
+slow_consumers = {}
+# Lobbies closed by the lifecycle sweeper or the caps, by reason.
+lobby_evictions = defaultdict(int)
+lobby_sweeper_started = False
+# Lobbies whose state changed, and chat/close records in order, waiting for
+# the next batch written to the lobby log.
+dirty_lobbies = set()
+lobby_log_records = []
+lobby_writer_started = False
 MIN_PLAYERS = 5
+# Seats per lobby unless the host asks for more (up to MAX_LOBBY_CAPACITY)
+# with ``max_players`` when creating it.
+LOBBY_CAPACITY = max(MIN_PLAYERS, int(os.environ.get("LOBBY_CAPACITY", MIN_PLAYERS)))
+MAX_LOBBY_CAPACITY = max(LOBBY_CAPACITY, int(os.environ.get("MAX_LOBBY_CAPACITY", 5000)))
 STARTING_SCORE = 10
 ELIMINATION_SCORE = 0
 MAX_NAME_LENGTH = 24
@@ -29,6 +103,79 @@ LOBBY_CODE_LENGTH = 5
 CLIENT_ID_MAX_LENGTH = 64
 CHAT_MESSAGE_MAX_LENGTH = 280
 CHAT_HISTORY_LIMIT = 100
+# Minimum seconds between lobby_update/typing_state flushes for one lobby; the
+# first request after a quiet interval is sent at once.
+BROADCAST_INTERVAL = float(os.environ.get("BROADCAST_INTERVAL", 0.05))
+# Spectators get a lobby's state at most every SPECTATOR_INTERVAL seconds; at
+# most MAX_SPECTATORS watch one lobby (0 means no cap).
+SPECTATOR_INTERVAL = float(os.environ.get("SPECTATOR_INTERVAL", 1.0))
+MAX_SPECTATORS = int(os.environ.get("MAX_SPECTATORS", 1000))
+# Events relayed to spectators that the client also reads as MessagePack.
+SPECTATOR_BINARY_EVENTS = ("lobby_update", "round_result")
+# Seconds players get to submit before the round is evaluated without them
+# (0 waits forever). "penalize" costs missing players TIMEOUT_PENALTY extra
+# points; "random" submits a random number for them instead.
+ROUND_TIME_LIMIT = float(os.environ.get("ROUND_TIME_LIMIT", 60))
+ROUND_TIMEOUT_POLICY = os.environ.get("ROUND_TIMEOUT_POLICY", "penalize")
+TIMEOUT_PENALTY = 1
+ROUND_TIMER_RESOLUTION = 0.25
+# Bots start answering BOT_FIRST_DELAY seconds into a round, about one every
+# BOT_NEXT_DELAY, but all of them within BOT_WINDOW_FRACTION of the time limit.
+BOT_FIRST_DELAY = (0.6, 1.2)
+BOT_NEXT_DELAY = (0.4, 0.9)
+BOT_WINDOW_FRACTION = 0.5
+BOT_SCHEDULER_RESOLUTION = 0.05
+# How often each bots.STRATEGIES entry is dealt to a new bot, by relative weight.
+BOT_STRATEGY_WEIGHTS = {"level_1": 2, "level_2": 2, "level_3": 1, "adaptive": 3, "random": 1}
+BOT_STRATEGY_WEIGHTS.update(json.loads(os.environ.get("BOT_STRATEGY_WEIGHTS", "{}")))
+# Lobbies without human players are closed after LOBBY_EMPTY_TTL seconds
+# without activity, any lobby after LOBBY_IDLE_TTL (0 disables either). Past
+# MAX_LOBBIES lobbies or MAX_LOBBY_MEMORY_MB of estimated lobby state the
+# least recently used lobbies are closed (0 means no cap).
+LOBBY_EMPTY_TTL = float(os.environ.get("LOBBY_EMPTY_TTL", 300))
+LOBBY_IDLE_TTL = float(os.environ.get("LOBBY_IDLE_TTL", 3600))
+MAX_LOBBIES = int(os.environ.get("MAX_LOBBIES", 10000))
+MAX_LOBBY_MEMORY_MB = float(os.environ.get("MAX_LOBBY_MEMORY_MB", 0))
+LOBBY_SWEEP_INTERVAL = 10
+# Approximate heap use per lobby, player and stored chat message (tracemalloc).
+LOBBY_BYTES_ESTIMATE = 4000
+PLAYER_BYTES_ESTIMATE = 1000
+CHAT_ENTRY_BYTES_ESTIMATE = 320
+# Append-only log of lobby state, replayed on startup; unset keeps lobbies in
+# memory only. Changes are written every LOBBY_LOG_INTERVAL seconds, so a crash
+# loses at most that much. Cluster workers each log to PATH.<worker index>.
+LOBBY_LOG_PATH = os.environ.get("LOBBY_LOG_PATH", "")
+LOBBY_LOG_INTERVAL = float(os.environ.get("LOBBY_LOG_INTERVAL", 1.0))
+# Lobbies encoded per slice before the writer yields to other greenlets.
+LOBBY_LOG_SLICE = 200
+# Seconds a disconnected player, or one restored from the lobby log, keeps
+# their seat for their client to rejoin; 0 removes players at once.
+RESUME_GRACE_PERIOD = float(os.environ.get("RESUME_GRACE_PERIOD", 60))
+RESUME_TIMER_RESOLUTION = 1
+# lobby_delta payloads kept per lobby, so a resuming client catches up with
+# one delta instead of a full update.
+RESUME_DELTA_HISTORY = 32
+# Event -> (per-sid limit, per-lobby limit), each (events per second, burst)
+# or None. RATE_LIMITS, a JSON object of the same shape, overrides events;
+# mapping one to null lifts its limits.
+RATE_LIMITS = {
+    "send_chat_message": ((1, 5), (10, 30)),
+    "chat_typing": ((2, 5), (20, 40)),
+    "request_chat_history": ((1, 3), None),
+    "request_lobby_sync": ((2, 5), None),
+}
+RATE_LIMITS.update(json.loads(os.environ.get("RATE_LIMITS", "{}")))
+# Sent back when one of these events is dropped; the others drop silently.
+RATE_LIMIT_MESSAGES = {
+    "send_chat_message": "You're sending messages too fast. Wait a moment and try again.",
+}
+# Packets waiting in a client's outbound queue at which it stops getting
+# typing_state (the next one carries the full list anyway), and at which it is
+# disconnected so the queue cannot grow without bound. Queues are checked every
+# CONSUMER_CHECK_INTERVAL seconds.
+SLOW_CONSUMER_BACKLOG = int(os.environ.get("SLOW_CONSUMER_BACKLOG", 50))
+STALLED_CONSUMER_BACKLOG = int(os.environ.get("STALLED_CONSUMER_BACKLOG", 1000))
+CONSUMER_CHECK_INTERVAL = 1
 
 BASE_RULE = "Submit a whole number between 0 and 100. Closest to 0.8x the average wins."
 ELIMINATION_RULES = {
@@ -47,8 +194,22 @@ def normalize_lobby_code(value):
     return cleaned.upper() or None
 
 
-def generate_lobby_code(length=LOBBY_CODE_LENGTH):
-    return "".join(random.choice(LOBBY_CODE_ALPHABET) for _ in range(length))
+# Codes this worker may use (the ones sharded to it) that no lobby holds.
+lobby_codes = LobbyCodeAllocator(
+    LOBBY_CODE_ALPHABET,
+    LOBBY_CODE_LENGTH,
+    accept=cluster.owns,
+    is_free=lambda code: code not in lobbies,
+)
+lobby_codes.refill()
+
+event_limits = EventLimits(RATE_LIMITS)
+
+lobby_store = None
+if LOBBY_LOG_PATH:
+    lobby_store = persistence.LobbyStore(
+        f"{LOBBY_LOG_PATH}.{cluster.worker_index}" if cluster.enabled else LOBBY_LOG_PATH
+    )
 
 
 def normalize_client_id(value):
@@ -62,269 +223,883 @@ def normalize_client_id(value):
     return value[:CLIENT_ID_MAX_LENGTH]
 
 
+def get_lobby(lobby_id, touch=True):
+    """Look up a lobby and, with ``touch``, mark it as just used.
+
+    Timers and feeds pass ``touch=False``: only players count as activity for
+    idle expiry and LRU eviction.
+    """
+    with lobbies_lock:
+        lobby = lobbies.get(lobby_id)
+        if lobby and touch:
+            lobbies.move_to_end(lobby_id)
+            lobby.last_active = time.monotonic()
+    return lobby
+
+
+def get_session_lobby_id(sid):
+    with lobbies_lock:
+        lobby_id = session_lobbies.get(sid)
+    return lobby_id or cluster.session_lobby(sid)
+
+
+def resolve_lobby_id(data, sid):
+    """Lobby named in the event payload, else the one ``sid`` has joined."""
+    return (
+        normalize_lobby_code(data.get("lobby_id"))
+        or get_session_lobby_id(sid)
+        or "DEFAULT"
+    )
+
+
+def register_session(lobby_id, lobby, sid, client_id):
+    """Index ``sid`` under ``lobby_id`` and return the lobby it was in before."""
+    if client_id:
+        lobby.client_sids[client_id] = sid
+    with lobbies_lock:
+        previous_lobby_id = session_lobbies.get(sid)
+        session_lobbies[sid] = lobby_id
+    cluster.set_session(sid, lobby_id)
+    return previous_lobby_id
+
+
+def unregister_session(lobby_id, lobby, sid, client_id=None):
+    if client_id and lobby.client_sids.get(client_id) == sid:
+        lobby.client_sids.pop(client_id, None)
+    with lobbies_lock:
+        if session_lobbies.get(sid) != lobby_id:
+            return
+        session_lobbies.pop(sid, None)
+    cluster.drop_session(sid)
+
+
+@contextmanager
+def locked_lobby(lobby_id, touch=True):
+    """Yield the lobby with its own lock held, or None if it does not exist.
+
+    The global ``lobbies_lock`` only guards lookups in ``lobbies``; everything
+    inside a lobby is guarded by that lobby's ``lock``. A lobby closed while
+    waiting for its lock counts as missing. ``touch`` is passed to get_lobby().
+    """
+    lobby = get_lobby(lobby_id, touch)
+    if not lobby:
+        yield None
+        return
+    with lobby.lock:
+        yield None if lobby.closed else lobby
+
+
+def mark_player_changed(lobby, player_id):
+    """Record that a field serialize_player() sends changed for ``player_id``.
+
+    Call it, with the lobby lock held, after changing such a field; the next
+    lobby_update sends that player's changes and nobody else's.
+    """
+    lobby.changed_players[player_id] = None
+
+
+def mark_all_players_changed(lobby):
+    """mark_player_changed() for every player, e.g. after a round is scored."""
+    lobby.changed_players.update(dict.fromkeys(lobby.players))
+
+
+def set_host(lobby, player_id):
+    """Give the host role to ``player_id``. The caller holds the lobby lock."""
+    if lobby.host_id in lobby.players:
+        mark_player_changed(lobby, lobby.host_id)
+    lobby.host_id = player_id
+    if player_id is not None:
+        mark_player_changed(lobby, player_id)
+
+
+def serialize_player(lobby, player_id, player):
+    return {
+        "id": player_id,
+        "name": player.name,
+        "score": player.score,
+        "is_host": player_id == lobby.host_id,
+        "eliminated": player.eliminated,
+        "is_bot": player.is_bot,
+        "ready": player.ready,
+        "choice_submitted": player.choice is not None,
+    }
+
+
 def serialize_players(lobby, only_active=False):
-    host_id = lobby.get("host_id")
+    """Return the lobby's players as sent to clients, in join order."""
+    return [
+        serialize_player(lobby, player_id, player)
+        for player_id, player in lobby.players.items()
+        if not (only_active and player.eliminated)
+    ]
+
+
+def lobby_update_room(lobby_id, delta_updates, binary=False):
+    """Sub-room for clients that take ``lobby_delta`` events or full updates.
+
+    MessagePack clients always take deltas and have a room of their own, which
+    also gets the binary copy of every emit_to_lobby() event.
+    """
+    if binary:
+        return f"{lobby_id}:{encoding.MSGPACK}"
+    return f"{lobby_id}:{'delta' if delta_updates else 'full'}"
+
+
+def json_room(lobby_id):
+    """Sub-room for JSON clients, which get the plain copy of emit_to_lobby() events."""
+    return f"{lobby_id}:json"
+
+
+def member_rooms(lobby_id, delta_updates, binary):
+    """Sub-rooms a player's socket sits in besides the lobby room itself."""
+    rooms = [lobby_update_room(lobby_id, delta_updates, binary)]
+    if not binary:
+        rooms.append(json_room(lobby_id))
+    return rooms
+
+
+def count_wire_mode(lobby, player, step):
+    """Add ``step`` to the lobby's counter for how ``player`` takes updates."""
+    if player.is_bot:
+        return
+    if player.binary:
+        lobby.binary_players += step
+    elif not player.delta_updates:
+        lobby.full_update_players += step
+
+
+def encode_for(binary, event_name, payload):
+    return encoding.pack(event_name, payload) if binary else payload
+
+
+def emit_to_lobby(lobby_id, event_name, payload, binary):
+    """Emit JSON to the lobby's JSON room, and MessagePack to its binary room if ``binary``."""
+    socketio.emit(event_name, payload, room=json_room(lobby_id))
+    if binary:
+        socketio.emit(
+            event_name,
+            encoding.pack(event_name, payload),
+            room=lobby_update_room(lobby_id, True, binary=True),
+        )
+
+
+def lobby_fields(lobby_id, lobby):
+    """The lobby_update fields besides ``players`` and ``version``; cheap to build."""
+    host_id = lobby.host_id
+    host_name = None
+    if host_id and host_id in lobby.players:
+        host_name = lobby.players[host_id].name
+    return {
+        "lobby_id": lobby_id,
+        "host_id": host_id,
+        "host_name": host_name,
+        "state": lobby.state,
+        "round": lobby.round,
+        "awaiting_next_round": lobby.awaiting_next_round,
+        "awaiting_choices": lobby.awaiting_choices,
+        "player_count": len(lobby.players),
+        "min_players": MIN_PLAYERS,
+        "max_players": lobby.capacity,
+        "eliminations": lobby.eliminations,
+        "active_rules": get_active_rules(lobby.eliminations),
+        "all_players_ready": all_active_players_ready(lobby),
+    }
+
+
+def flush_lobby_changes(lobby_id, lobby):
+    """Fold the changes recorded since the last version into a new one.
+
+    Only the players in ``changed_players``/``removed_players`` are looked at.
+    Returns the ``lobby_delta`` (changed top-level fields, changed fields of
+    known players, whole entries for new ones, removed ids), or None if
+    nothing clients see changed. Players keep their order, so a client can
+    apply it by updating known ids in place and appending unknown ones. The
+    caller holds the lobby lock.
+    """
+    fields = lobby_fields(lobby_id, lobby)
+    sent_fields = lobby.sent_fields
+    changed_fields = {
+        key: value for key, value in fields.items() if sent_fields.get(key) != value
+    }
+    lobby.sent_fields = fields
+    sent_players = lobby.sent_players
+    removed = [
+        player_id
+        for player_id in lobby.removed_players
+        if sent_players.pop(player_id, None) is not None
+    ]
     players = []
-    for player_id, player in lobby["players"].items():
-        if only_active and player["eliminated"]:
+    for player_id in lobby.changed_players:
+        player = lobby.players.get(player_id)
+        if player is None:
+            continue
+        current = serialize_player(lobby, player_id, player)
+        previous = sent_players.get(player_id)
+        sent_players[player_id] = current
+        if previous is None:
+            players.append(current)
             continue
-        players.append(
-            {
-                "id": player_id,
-                "name": player["name"],
-                "score": player["score"],
-                "is_host": player_id == host_id,
-                "eliminated": player["eliminated"],
-                "is_bot": player.get("is_bot", False),
-                "ready": player.get("ready", False),
-                "choice_submitted": player.get("choice") is not None,
-            }
+        changes = {key: value for key, value in current.items() if previous[key] != value}
+        if changes:
+            changes["id"] = player_id
+            players.append(changes)
+    lobby.changed_players = {}
+    lobby.removed_players = {}
+    if not (changed_fields or players or removed):
+        return None
+
+    lobby.version += 1
+    lobby.lobby_payload = None
+    mark_lobby_dirty(lobby_id)
+    delta = {
+        "lobby_id": lobby_id,
+        "version": lobby.version,
+        "base_version": lobby.version - 1,
+        "fields": changed_fields,
+        "players": players,
+        "removed": removed,
+    }
+    if not lobby.recent_deltas:
+        lobby.recent_deltas = deque(maxlen=RESUME_DELTA_HISTORY)
+    lobby.recent_deltas.append(delta)
+    return delta
+
+
+def prime_lobby_changes(lobby_id, lobby):
+    """Take the lobby's current state as what clients hold, e.g. after a restore."""
+    lobby.sent_fields = lobby_fields(lobby_id, lobby)
+    lobby.sent_players = {
+        player_id: serialize_player(lobby, player_id, player)
+        for player_id, player in lobby.players.items()
+    }
+    lobby.changed_players = {}
+    lobby.removed_players = {}
+    lobby.lobby_payload = None
+
+
+def lobby_snapshot(lobby_id, lobby):
+    """The full ``lobby_update`` payload for the lobby's current version.
+
+    Built from what the last flush sent, so it matches the deltas that follow
+    it, and cached until the version moves. The caller holds the lobby lock.
+    """
+    payload = lobby.lobby_payload
+    if payload is None:
+        payload = lobby.lobby_payload = EncodedPayload(
+            lobby.sent_fields,
+            players=list(lobby.sent_players.values()),
+            version=lobby.version,
         )
-    return players
+    return payload
 
 
-def broadcast_lobby_update(lobby_id):
-    with lobbies_lock:
-        lobby = lobbies.get(lobby_id)
+def broadcast_lobby_update(lobby_id, snapshot_sid=None):
+    """Send the lobby's changes to the room.
+
+    Clients that joined with ``delta_updates`` get a ``lobby_delta`` holding
+    only what changed since the previous version; legacy clients get the full
+    ``lobby_update`` payload, which is only built when one of them is in the
+    lobby. ``snapshot_sid`` (a delta client that just joined) gets the full
+    payload instead of the delta.
+    """
+    payload = None
+    with locked_lobby(lobby_id) as lobby:
         if not lobby:
             return
-        host_id = lobby.get("host_id")
-        host_name = None
-        if host_id and host_id in lobby["players"]:
-            host_name = lobby["players"][host_id]["name"]
-        payload = {
-            "lobby_id": lobby_id,
-            "players": serialize_players(lobby),
-            "host_id": host_id,
-            "host_name": host_name,
-            "state": lobby["state"],
-            "round": lobby["round"],
-            "awaiting_next_round": lobby.get("awaiting_next_round", False),
-            "awaiting_choices": lobby.get("awaiting_choices", False),
-            "player_count": len(lobby["players"]),
-            "min_players": MIN_PLAYERS,
-            "eliminations": lobby["eliminations"],
-            "active_rules": get_active_rules(lobby["eliminations"]),
-            "all_players_ready": all_active_players_ready(lobby),
-        }
-    socketio.emit("lobby_update", payload, room=lobby_id)
+        lobby.pending_broadcasts.discard("lobby_update")
+        delta = flush_lobby_changes(lobby_id, lobby)
+        has_full_clients = delta is not None and lobby.full_update_players > 0
+        if has_full_clients or snapshot_sid:
+            payload = lobby_snapshot(lobby_id, lobby)
+        binary = lobby.binary_players > 0
+        snapshot_player = lobby.players.get(snapshot_sid)
+        snapshot_binary = bool(snapshot_player and snapshot_player.binary)
+
+    if has_full_clients:
+        socketio.emit("lobby_update", payload, room=lobby_update_room(lobby_id, False))
+    if snapshot_sid:
+        socketio.emit(
+            "lobby_update",
+            encode_for(snapshot_binary, "lobby_update", payload),
+            room=snapshot_sid,
+        )
+    if delta:
+        socketio.emit(
+            "lobby_delta",
+            delta,
+            room=lobby_update_room(lobby_id, True),
+            skip_sid=snapshot_sid,
+        )
+        if binary:
+            socketio.emit(
+                "lobby_delta",
+                encoding.pack("lobby_delta", delta),
+                room=lobby_update_room(lobby_id, True, binary=True),
+                skip_sid=snapshot_sid,
+            )
 
 
-def get_lobby_chat(lobby):
-    return lobby.setdefault("chat", [])
+def check_consumers():
+    """One pass over this worker's outbound queues.
 
+    Clients that stopped reading are dropped (they reconnect and resync);
+    slow ones are noted in ``slow_consumers`` by lobby, so typing_state can
+    skip them without looking at every member's queue on each emit.
+    """
+    global slow_consumers
+    slow = defaultdict(list)
+    for eio_sid, eio_socket in list(socketio.server.eio.sockets.items()):
+        backlog = eio_socket.queue.qsize()
+        if backlog < SLOW_CONSUMER_BACKLOG:
+            continue
+        sid = socketio.server.manager.sid_from_eio_sid(eio_sid, "/")
+        if not sid:
+            continue
+        if backlog >= STALLED_CONSUMER_BACKLOG:
+            metrics.STALLED_CONSUMER_DISCONNECTS.inc()
+            socketio.server.disconnect(sid)
+            continue
+        with lobbies_lock:
+            lobby_id = session_lobbies.get(sid)
+        if lobby_id:
+            slow[lobby_id].append(sid)
+    slow_consumers = slow
+
+
+def run_consumer_monitor():
+    while True:
+        eventlet.sleep(CONSUMER_CHECK_INTERVAL)
+        check_consumers()
 
-def ensure_typing_tracker(lobby):
-    return lobby.setdefault("typing_players", {})
+
+def lobby_delta_since(lobby_id, lobby, since_version):
+    """One lobby_delta taking a client from ``since_version`` to the current one.
+
+    Returns None when the deltas after ``since_version`` are no longer kept,
+    so the client needs the full payload. The caller holds the lobby lock.
+    """
+    if since_version == lobby.version:
+        deltas = []
+    else:
+        deltas = list(lobby.recent_deltas)
+        start = next(
+            (index for index, delta in enumerate(deltas) if delta["base_version"] == since_version),
+            None,
+        )
+        if start is None:
+            return None
+        deltas = deltas[start:]
+    fields = {}
+    players = {}
+    removed = {}
+    for delta in deltas:
+        fields.update(delta["fields"])
+        for player_id in delta["removed"]:
+            players.pop(player_id, None)
+            removed[player_id] = True
+        for change in delta["players"]:
+            players.setdefault(change["id"], {}).update(change)
+    return {
+        "lobby_id": lobby_id,
+        "version": lobby.version,
+        "base_version": since_version,
+        "fields": fields,
+        "players": list(players.values()),
+        "removed": list(removed),
+    }
 
 
 def prune_typing_players(lobby, max_age=5):
-    tracker = ensure_typing_tracker(lobby)
+    tracker = lobby.typing_players
     cutoff = time.time() - max_age
     names = []
     for sid, timestamp in list(tracker.items()):
-        player = lobby["players"].get(sid)
+        player = lobby.players.get(sid)
         if not player or timestamp < cutoff:
             tracker.pop(sid, None)
             continue
-        names.append(player["name"])
+        names.append(player.name)
     return names
 
 
 def emit_typing_state(lobby_id):
-    with lobbies_lock:
-        lobby = lobbies.get(lobby_id)
+    with locked_lobby(lobby_id) as lobby:
         if not lobby:
             return
+        lobby.pending_broadcasts.discard("typing_state")
         names = prune_typing_players(lobby)
-    socketio.emit("typing_state", {"lobby_id": lobby_id, "players": names}, room=lobby_id)
+    slow_sids = slow_consumers.get(lobby_id, [])
+    if slow_sids:
+        metrics.SLOW_CONSUMER_SKIPS.inc("typing_state", len(slow_sids))
+    socketio.emit(
+        "typing_state",
+        {"lobby_id": lobby_id, "players": names},
+        room=lobby_id,
+        skip_sid=slow_sids,
+    )
 
 
-def append_chat_message(lobby, player_id, player_name, text, is_bot=False):
-    entry = {
-        "id": uuid.uuid4().hex,
-        "player_id": player_id,
-        "name": player_name,
-        "message": text,
-        "timestamp": int(time.time() * 1000),
-        "is_bot": is_bot,
-    }
-    chat_log = get_lobby_chat(lobby)
-    chat_log.append(entry)
-    if len(chat_log) > CHAT_HISTORY_LIMIT:
-        lobby["chat"] = chat_log[-CHAT_HISTORY_LIMIT:]
+BROADCAST_EMITTERS = {
+    "lobby_update": broadcast_lobby_update,
+    "typing_state": emit_typing_state,
+}
+
+
+def request_broadcast(lobby_id, event_name):
+    """Send a ``lobby_update`` or ``typing_state``, or queue it for the next flush.
+
+    A lobby that sent nothing in the last ``BROADCAST_INTERVAL`` sends at once
+    and opens a new window; requests made inside the window are folded into
+    one flush at its end, so a lobby sends at most one of each per interval.
+    Calling the emitter directly (as round transitions do) sends at once and
+    clears the request.
+    """
+    with locked_lobby(lobby_id) as lobby:
+        if not lobby:
+            return
+        pending = lobby.pending_broadcasts
+        if event_name in pending:
+            coalesced_emits[event_name] += 1
+            return
+        pending.add(event_name)
+        if lobby.flush_scheduled:
+            return
+        lobby.flush_scheduled = True
+        delay = lobby.flush_window_end - time.monotonic()
+    if delay > 0:
+        socketio.start_background_task(flush_broadcasts, lobby_id, delay)
+    else:
+        flush_broadcasts(lobby_id)
+
+
+@sampling_profiler.profiled("flush_broadcasts")
+def flush_broadcasts(lobby_id, delay=0):
+    if delay > 0:
+        eventlet.sleep(delay)
+    with locked_lobby(lobby_id) as lobby:
+        if not lobby:
+            return
+        lobby.flush_scheduled = False
+        lobby.flush_window_end = time.monotonic() + BROADCAST_INTERVAL
+        pending = [name for name in BROADCAST_EMITTERS if name in lobby.pending_broadcasts]
+    for event_name in pending:
+        BROADCAST_EMITTERS[event_name](lobby_id)
+
+
+def spectator_room(lobby_id, binary=False):
+    """Room of a lobby's spectators; MessagePack ones have their own."""
+    return f"{lobby_id}:watch:{encoding.MSGPACK}" if binary else f"{lobby_id}:watch"
+
+
+def emit_to_spectators(lobby_id, event_name, payload, binary):
+    """Emit to both spectator rooms; ``binary`` when the MessagePack one has members."""
+    socketio.emit(event_name, payload, room=spectator_room(lobby_id))
+    if binary:
+        if event_name in SPECTATOR_BINARY_EVENTS:
+            payload = encoding.pack(event_name, payload)
+        socketio.emit(event_name, payload, room=spectator_room(lobby_id, binary=True))
+
+
+def remove_spectator(lobby_id, lobby, sid):
+    """Stop ``sid`` watching the lobby. The caller holds the lobby lock."""
+    binary = lobby.spectators.pop(sid, None)
+    if binary is None:
+        return
+    if binary:
+        lobby.binary_spectators -= 1
+    unregister_session(lobby_id, lobby, sid)
+    leave_room(spectator_room(lobby_id, binary), sid=sid)
+
+
+def run_spectator_feed(lobby_id, sent_version):
+    """Send a lobby's spectators its state, at most every SPECTATOR_INTERVAL.
+
+    Spectators get the payloads the players were sent, already encoded: the
+    newest lobby_update, if its version moved, after any round_result or
+    game_over queued in spectator_events since the last tick. The feed stops
+    once nobody is watching. Watching does not count as lobby activity, so
+    the lobby is looked up without get_lobby().
+    """
+    while True:
+        eventlet.sleep(SPECTATOR_INTERVAL)
+        with lobbies_lock:
+            lobby = lobbies.get(lobby_id)
+        if not lobby:
+            return
+        with lobby.lock:
+            if lobby.closed:
+                return
+            if not lobby.spectators:
+                lobby.spectator_feed = False
+                return
+            events = lobby.spectator_events
+            lobby.spectator_events = {}
+            payload = None
+            if lobby.version != sent_version:
+                sent_version = lobby.version
+                payload = lobby_snapshot(lobby_id, lobby)
+            binary = lobby.binary_spectators > 0
+        for event_name, event_payload in events.items():
+            emit_to_spectators(lobby_id, event_name, event_payload, binary)
+        if payload:
+            emit_to_spectators(lobby_id, "lobby_update", payload, binary)
+
+
+def append_chat_message(lobby_id, lobby, player_id, player_name, text, is_bot=False):
+    """Add a message to the lobby's chat and return its ``chat_message`` payload.
+
+    The payload is stored as is and replayed by emit_chat_history(), which
+    splices in its cached encodings, so it is serialized once per wire format.
+    Its ``id`` is the lobby's next chat sequence number.
+    """
+    lobby.chat_seq += 1
+    entry = EncodedPayload(
+        {
+            "lobby_id": lobby_id,
+            "id": lobby.chat_seq,
+            "seq": lobby.chat_seq,
+            "player_id": player_id,
+            "name": player_name,
+            "message": text,
+            "timestamp": int(time.time() * 1000),
+            "is_bot": is_bot,
+        }
+    )
+    if not lobby.chat:
+        lobby.chat = deque(maxlen=CHAT_HISTORY_LIMIT)
+    lobby.chat.append(entry)
+    log_lobby_record(("chat", lobby_id, dict(entry)))
     return entry
 
 
-def emit_chat_history(lobby_id, target_sid):
+def chat_messages_since(lobby, since):
+    """Stored messages with a sequence number above ``since``, oldest first.
+
+    A ``since`` ahead of the lobby's counter (the lobby was recreated under the
+    same code) replays everything that is stored.
+    """
+    if since > lobby.chat_seq:
+        since = 0
+    missing = min(lobby.chat_seq - since, len(lobby.chat))
+    return list(islice(lobby.chat, len(lobby.chat) - missing, None))
+
+
+def parse_chat_since(value):
+    try:
+        return max(int(value), 0)
+    except (TypeError, ValueError):
+        return 0
+
+
+def emit_chat_history(lobby_id, target_sid, since=0):
     if not target_sid:
         return
-    with lobbies_lock:
-        lobby = lobbies.get(lobby_id)
+    with locked_lobby(lobby_id) as lobby:
         if not lobby:
             return
-        history = [dict(message) for message in get_lobby_chat(lobby)]
-    socketio.emit(
-        "chat_history",
-        {"lobby_id": lobby_id, "messages": history[-CHAT_HISTORY_LIMIT:]},
-        room=target_sid,
+        history = chat_messages_since(lobby, since)
+        latest_seq = lobby.chat_seq
+        player = lobby.players.get(target_sid)
+        binary = bool(player and player.binary)
+    payload = SplicedPayload(
+        {
+            "lobby_id": lobby_id,
+            "messages": history,
+            "since": since if since <= latest_seq else 0,
+            "latest_seq": latest_seq,
+        },
+        "messages",
     )
+    socketio.emit("chat_history", encode_for(binary, "chat_history", payload), room=target_sid)
 
 
 def assign_new_host(lobby):
-    for player_id, player in lobby["players"].items():
-        if not player["eliminated"] and not player.get("is_bot"):
-            lobby["host_id"] = player_id
+    for player_id, player in lobby.players.items():
+        if not player.eliminated and not player.is_bot and not player.detached:
+            set_host(lobby, player_id)
             return
-    lobby["host_id"] = next(iter(lobby["players"]), None)
+    set_host(lobby, next(iter(lobby.players), None))
 
 
-def calculate_target(choices):
-    """Calculate the round target from the submitted choices."""
-    if not choices:
-        return 0.0
-    average = sum(choices) / len(choices)
-    return average * 0.8
+def host_is_connected(lobby):
+    host = lobby.players.get(lobby.host_id)
+    return bool(host) and not host.is_bot and not host.detached
 
 
 def check_winner(lobby):
     """Return the last remaining active player if the game has ended."""
-    active_players = [
-        player for player in lobby["players"].values() if not player["eliminated"]
-    ]
-    if len(active_players) == 1:
-        return active_players[0]
+    if lobby.active_count != 1:
+        return None
+    for player in lobby.players.values():
+        if not player.eliminated:
+            return player
     return None
 
 
 def get_active_players(lobby):
     return {
         player_id: player
-        for player_id, player in lobby["players"].items()
-        if not player["eliminated"]
+        for player_id, player in lobby.players.items()
+        if not player.eliminated
     }
 
 
-def apply_rules(lobby, target):
-    active_players = get_active_players(lobby)
-    elimination_count = lobby["eliminations"]
-    disqualified = set()
-    extra_penalties = defaultdict(int)
-    rule_messages = []
+def new_lobby(capacity=LOBBY_CAPACITY):
+    return Lobby(capacity)
 
-    if elimination_count >= 1:
-        number_groups = defaultdict(list)
-        for player_id, player in active_players.items():
-            number_groups[player["choice"]].append(player_id)
 
-        duplicates = {
-            number: ids for number, ids in number_groups.items() if len(ids) > 1
-        }
-        if duplicates:
-            for ids in duplicates.values():
-                for player_id in ids:
-                    disqualified.add(player_id)
-                    extra_penalties[player_id] += 1
-            rule_messages.append("Duplicate choices were disqualified (-1 penalty).")
+def create_lobby_if_missing(lobby_id):
+    """Return the lobby, creating it first if needed. The caller holds ``lobbies_lock``."""
+    if lobby_id not in lobbies:
+        lobbies[lobby_id] = new_lobby()
+        start_lobby_sweeper()
+        if MAX_LOBBIES and len(lobbies) > MAX_LOBBIES:
+            socketio.start_background_task(enforce_lobby_caps)
+    return lobbies[lobby_id]
 
-    winners = set()
 
-    zero_choosers = [
-        player_id
-        for player_id, player in active_players.items()
-        if player["choice"] == 0 and player_id not in disqualified
-    ]
-    hundred_choosers = [
-        player_id
-        for player_id, player in active_players.items()
-        if player["choice"] == 100 and player_id not in disqualified
-    ]
-    if elimination_count >= 3 and zero_choosers and hundred_choosers:
-        winners.update(hundred_choosers)
-        rule_messages.append(
-            "0/100 combo activated: player(s) with 100 win the round."
-        )
+def has_human_players(lobby):
+    return any(not player.is_bot and not player.detached for player in lobby.players.values())
 
-    if not winners:
-        closest_distance = None
-        for player_id, player in active_players.items():
-            if player_id in disqualified:
-                continue
-            distance = abs(player["choice"] - target)
-            if closest_distance is None or distance < closest_distance - 1e-9:
-                winners = {player_id}
-                closest_distance = distance
-            elif math.isclose(distance, closest_distance, rel_tol=1e-9, abs_tol=1e-6):
-                winners.add(player_id)
-
-    exact_target_hitters = []
-    base_loss = 1
-    if elimination_count >= 2:
-        for player_id, player in active_players.items():
-            if player_id in disqualified:
-                continue
-            if math.isclose(player["choice"], target, rel_tol=1e-9, abs_tol=1e-6):
-                exact_target_hitters.append(player_id)
-        if exact_target_hitters:
-            base_loss = 2
-            rule_messages.append("Exact target hit: all other players lose 2 points.")
 
-    return {
-        "target": target,
-        "winners": winners,
-        "disqualified": disqualified,
-        "extra_penalties": extra_penalties,
-        "exact_target_hitters": exact_target_hitters,
-        "base_loss": base_loss,
-        "rule_messages": rule_messages,
+def estimate_lobby_bytes(lobby):
+    return (
+        LOBBY_BYTES_ESTIMATE
+        + PLAYER_BYTES_ESTIMATE * len(lobby.players)
+        + CHAT_ENTRY_BYTES_ESTIMATE * len(lobby.chat)
+    )
+
+
+def close_lobby(lobby_id, reason, idle_for=None):
+    """Remove a lobby, free its code and tell the players still in it.
+
+    With ``idle_for`` the lobby is only closed if it has not been used for
+    that many seconds, so a lobby touched since it was picked survives.
+    Returns whether the lobby was closed.
+    """
+    with lobbies_lock:
+        lobby = lobbies.get(lobby_id)
+        if not lobby:
+            return False
+        if idle_for is not None and time.monotonic() - lobby.last_active < idle_for:
+            return False
+        del lobbies[lobby_id]
+    with lobby.lock:
+        lobby.closed = True
+        members = [
+            (sid, player.client_id) for sid, player in lobby.players.items() if not player.is_bot
+        ]
+        for sid, client_id in members:
+            unregister_session(lobby_id, lobby, sid, client_id)
+        spectators = list(lobby.spectators)
+        for sid in spectators:
+            unregister_session(lobby_id, lobby, sid)
+    log_lobby_record(("close", lobby_id))
+    event_limits.forget_lobby(lobby_id)
+    lobby_evictions[reason] += 1
+    notice = {
+        "lobby_id": lobby_id,
+        "reason": reason,
+        "message": f"Lobby {lobby_id} was closed. Create or join a new lobby to play on.",
     }
+    if members:
+        socketio.emit("lobby_closed", notice, room=lobby_id)
+    if spectators:
+        emit_to_spectators(lobby_id, "lobby_closed", notice, True)
+    for room in (
+        lobby_id,
+        lobby_update_room(lobby_id, True),
+        lobby_update_room(lobby_id, False),
+        lobby_update_room(lobby_id, True, binary=True),
+        json_room(lobby_id),
+        spectator_room(lobby_id),
+        spectator_room(lobby_id, binary=True),
+    ):
+        socketio.close_room(room)
+    return True
 
 
-def create_lobby_if_missing(lobby_id):
-    if lobby_id not in lobbies:
-        lobbies[lobby_id] = {
-            "players": {},
-            "state": "waiting",
-            "round": 0,
-            "eliminations": 0,
-            "awaiting_choices": False,
-            "awaiting_next_round": False,
-            "host_id": None,
-            "bot_counter": 0,
-            "chat": [],
-            "typing_players": {},
-        }
-    return lobbies[lobby_id]
+def start_lobby_sweeper():
+    global lobby_sweeper_started
+    if not lobby_sweeper_started:
+        lobby_sweeper_started = True
+        socketio.start_background_task(run_lobby_sweeper)
+        socketio.start_background_task(run_consumer_monitor)
 
 
-def get_bot_players(lobby):
+def run_lobby_sweeper():
+    while True:
+        eventlet.sleep(LOBBY_SWEEP_INTERVAL)
+        sweep_lobbies()
+
+
+@sampling_profiler.profiled("sweep_lobbies")
+def sweep_lobbies():
+    """Close lobbies that sat empty or idle too long, then enforce the caps."""
+    ttls = [ttl for ttl in (LOBBY_EMPTY_TTL, LOBBY_IDLE_TTL) if ttl > 0]
+    if ttls:
+        now = time.monotonic()
+        with lobbies_lock:
+            candidates = list(lobbies.items())
+        for lobby_id, lobby in candidates:
+            idle = now - lobby.last_active
+            # Least recently used first, so the rest were used more recently.
+            if idle < min(ttls):
+                break
+            if LOBBY_IDLE_TTL > 0 and idle >= LOBBY_IDLE_TTL:
+                close_lobby(lobby_id, "idle", idle_for=LOBBY_IDLE_TTL)
+            elif LOBBY_EMPTY_TTL > 0 and idle >= LOBBY_EMPTY_TTL and not has_human_players(lobby):
+                close_lobby(lobby_id, "empty", idle_for=LOBBY_EMPTY_TTL)
+    enforce_lobby_caps()
+
+
+def enforce_lobby_caps():
+    """Close least recently used lobbies until both caps are met."""
+    if MAX_LOBBIES:
+        with lobbies_lock:
+            excess = list(islice(lobbies, max(len(lobbies) - MAX_LOBBIES, 0)))
+        for lobby_id in excess:
+            close_lobby(lobby_id, "lobby_cap")
+    if MAX_LOBBY_MEMORY_MB > 0:
+        budget = MAX_LOBBY_MEMORY_MB * 1024 * 1024
+        with lobbies_lock:
+            sizes = [(lobby_id, estimate_lobby_bytes(lobby)) for lobby_id, lobby in lobbies.items()]
+        total = sum(size for _, size in sizes)
+        for lobby_id, size in sizes:
+            if total <= budget:
+                break
+            if close_lobby(lobby_id, "memory_cap"):
+                total -= size
+
+
+def lobby_stats():
+    with lobbies_lock:
+        lobby_list = list(lobbies.values())
     return {
-        player_id: player
-        for player_id, player in lobby["players"].items()
-        if player.get("is_bot")
+        "lobbies": len(lobby_list),
+        "players": sum(len(lobby.players) for lobby in lobby_list),
+        "spectators": sum(len(lobby.spectators) for lobby in lobby_list),
+        "estimated_bytes": sum(estimate_lobby_bytes(lobby) for lobby in lobby_list),
+        "evictions": dict(lobby_evictions),
     }
 
 
-def remove_duplicate_clients(lobby, client_id, player_name, current_sid):
-    """Remove any non-bot players that appear to be the same attendee."""
-    if not client_id and not player_name:
-        return [], False
+def mark_lobby_dirty(lobby_id):
+    """Queue the lobby's state for the next batch written to the lobby log."""
+    if lobby_store:
+        dirty_lobbies.add(lobby_id)
+        start_lobby_writer()
+
+
+def log_lobby_record(record):
+    if lobby_store:
+        lobby_log_records.append(record)
+        start_lobby_writer()
+
+
+def start_lobby_writer():
+    global lobby_writer_started
+    if not lobby_writer_started:
+        lobby_writer_started = True
+        socketio.start_background_task(run_lobby_writer)
 
-    normalized_name = normalize_display_name(player_name)
-    duplicates = []
-    host_replaced = False
-    for sid, player in list(lobby["players"].items()):
-        if sid == current_sid or player.get("is_bot"):
+
+def run_lobby_writer():
+    while True:
+        eventlet.sleep(LOBBY_LOG_INTERVAL)
+        write_lobby_log()
+
+
+def encode_lobby_state(lobby_id, with_chat=False):
+    """Log records for the lobby's current state, or [] if it is gone."""
+    with lobbies_lock:
+        lobby = lobbies.get(lobby_id)
+    if not lobby:
+        return []
+    with lobby.lock:
+        if lobby.closed:
+            return []
+        records = [persistence.encode(("state", lobby_id, persistence.lobby_record(lobby)))]
+        if with_chat:
+            records.extend(
+                persistence.encode(("chat", lobby_id, dict(entry))) for entry in lobby.chat
+            )
+    return records
+
+
+@sampling_profiler.profiled("write_lobby_log")
+def write_lobby_log():
+    """Append the changes queued since the last batch, off the request path.
+
+    Records are encoded here, one per changed lobby however often it changed;
+    the write and fsync run in a real thread so the hub keeps serving events.
+    Encoding yields every LOBBY_LOG_SLICE lobbies, so a large batch or a
+    compaction snapshot doesn't stall the hub either.
+    """
+    global lobby_log_records
+    records = [persistence.encode(record) for record in lobby_log_records]
+    lobby_log_records = []
+    changed = list(dirty_lobbies)
+    dirty_lobbies.clear()
+    records.extend(encode_lobby_states(changed))
+    tpool.execute(lobby_store.append, records)
+    if lobby_store.needs_compaction():
+        with lobbies_lock:
+            lobby_ids = list(lobbies)
+        snapshot = encode_lobby_states(lobby_ids, with_chat=True)
+        tpool.execute(lobby_store.rewrite, snapshot)
+
+
+def encode_lobby_states(lobby_ids, with_chat=False):
+    """encode_lobby_state() for each lobby, yielding to the hub between slices."""
+    records = []
+    for count, lobby_id in enumerate(lobby_ids, 1):
+        records.extend(encode_lobby_state(lobby_id, with_chat))
+        if count % LOBBY_LOG_SLICE == 0:
+            eventlet.sleep(0)
+    return records
+
+
+def restore_lobbies():
+    """Rebuild the lobbies saved in the lobby log and resume their games.
+
+    Human players come back detached, under their old sid, until their client
+    rejoins; the ones that have not after RESUME_GRACE_PERIOD leave the lobby.
+    """
+    saved = lobby_store.load(CHAT_HISTORY_LIMIT)
+    for lobby_id, (record, chat) in saved.items():
+        if not cluster.owns(lobby_id):
             continue
-        same_client = client_id and player.get("client_id") == client_id
-        same_name = normalized_name and normalize_display_name(player.get("name", "")) == normalized_name
-        if same_client and same_name:
-            lobby["players"].pop(sid, None)
-            duplicates.append(sid)
-            if lobby.get("host_id") == sid:
-                lobby["host_id"] = None
-                host_replaced = True
-    return duplicates, host_replaced
+        lobby = persistence.restore_lobby(
+            record, [EncodedPayload(entry) for entry in chat], CHAT_HISTORY_LIMIT
+        )
+        if lobby.capacity is None:
+            lobby.capacity = LOBBY_CAPACITY
+        for player_id, player in lobby.players.items():
+            if not player.is_bot:
+                player.detached = True
+                lobby.client_sids[player.client_id] = player_id
+                schedule_resume_deadline(lobby_id, player_id)
+        index_players(lobby)
+        prime_lobby_changes(lobby_id, lobby)
+        with lobbies_lock:
+            lobbies[lobby_id] = lobby
+        if lobby.state == "running" and lobby.awaiting_choices:
+            schedule_round_deadline(lobby_id, lobby.round)
+            schedule_bot_turns(lobby_id, lobby)
+        elif lobby.state == "finished":
+            socketio.start_background_task(reset_lobby_state, lobby_id)
+    if saved:
+        start_lobby_sweeper()
+    return len(saved)
+
+
+def get_bot_players(lobby):
+    return {
+        player_id: player
+        for player_id, player in lobby.players.items()
+        if player.is_bot
+    }
 
 
 def normalize_display_name(name):
@@ -335,67 +1110,167 @@ def normalize_display_name(name):
 
 def is_name_taken(lobby, player_name):
     target = normalize_display_name(player_name)
-    for player in lobby["players"].values():
-        if player.get("is_bot"):
+    return bool(target) and target in lobby.human_names
+
+
+def parse_capacity(value):
+    """Seats asked for by a host, clamped to what the server allows."""
+    try:
+        capacity = int(value)
+    except (TypeError, ValueError):
+        return LOBBY_CAPACITY
+    return min(max(capacity, MIN_PLAYERS), MAX_LOBBY_CAPACITY)
+
+
+def add_player(lobby, player):
+    """Seat ``player`` and update the lobby's indexes. The caller holds the lobby lock."""
+    lobby.players[player.id] = player
+    if not player.eliminated:
+        lobby.active_count += 1
+    if player.is_bot:
+        lobby.bot_ids[player.id] = None
+    else:
+        lobby.human_names[normalize_display_name(player.name)] = player.id
+        if holds_up_ready(player):
+            lobby.unready_count += 1
+    count_wire_mode(lobby, player, 1)
+    lobby.removed_players.pop(player.id, None)
+    mark_player_changed(lobby, player.id)
+
+
+def discard_player(lobby, player_id):
+    """Unseat a player and update the lobby's indexes. The caller holds the lobby lock."""
+    player = lobby.players.pop(player_id, None)
+    if player is None:
+        return None
+    if not player.eliminated:
+        lobby.active_count -= 1
+        set_player_choice(lobby, player, None)
+    if player.is_bot:
+        lobby.bot_ids.pop(player_id, None)
+    else:
+        name = normalize_display_name(player.name)
+        if lobby.human_names.get(name) == player_id:
+            del lobby.human_names[name]
+        if holds_up_ready(player):
+            lobby.unready_count -= 1
+    count_wire_mode(lobby, player, -1)
+    lobby.changed_players.pop(player_id, None)
+    lobby.removed_players[player_id] = None
+    return player
+
+
+def holds_up_ready(player):
+    """Whether ``player`` counts in ``unready_count``.
+
+    Detached seats do not: the host can start the next round without them and
+    the round deadline times them out.
+    """
+    return not (player.is_bot or player.ready or player.eliminated or player.detached)
+
+
+def set_player_ready(lobby, player, ready):
+    if player.ready != ready and not player.is_bot and not player.eliminated:
+        if not player.detached:
+            lobby.unready_count += -1 if ready else 1
+    if player.ready != ready:
+        player.ready = ready
+        mark_player_changed(lobby, player.id)
+
+
+def set_player_choice(lobby, player, choice):
+    """Set an active player's choice (None clears it) and the round counters."""
+    if player.choice is not None:
+        lobby.submitted_count -= 1
+        lobby.choice_sum -= player.choice
+    if choice is not None:
+        lobby.submitted_count += 1
+        lobby.choice_sum += choice
+    if (player.choice is None) != (choice is None):
+        mark_player_changed(lobby, player.id)
+    player.choice = choice
+
+
+def round_complete(lobby):
+    """Whether every active player has a choice in."""
+    return lobby.submitted_count >= lobby.active_count
+
+
+def index_players(lobby):
+    """Rebuild the lobby's player indexes from scratch, e.g. after a restore."""
+    lobby.human_names = {}
+    lobby.bot_ids = {}
+    lobby.unready_count = 0
+    lobby.active_count = lobby.submitted_count = lobby.choice_sum = 0
+    lobby.binary_players = lobby.full_update_players = 0
+    for player_id, player in lobby.players.items():
+        if not player.eliminated:
+            lobby.active_count += 1
+            if player.choice is not None:
+                lobby.submitted_count += 1
+                lobby.choice_sum += player.choice
+        if player.is_bot:
+            lobby.bot_ids[player_id] = None
             continue
-        existing = normalize_display_name(player.get("name", ""))
-        if existing and existing == target:
-            return True
-    return False
+        lobby.human_names[normalize_display_name(player.name)] = player_id
+        if holds_up_ready(player):
+            lobby.unready_count += 1
+        count_wire_mode(lobby, player, 1)
 
 
 def all_active_players_ready(lobby):
-    for player in get_active_players(lobby).values():
-        if player.get("is_bot"):
-            continue
-        if not player.get("ready"):
-            return False
-    return True
+    return lobby.unready_count == 0
 
 
 def create_bot_player(lobby):
-    lobby["bot_counter"] += 1
+    lobby.bot_counter += 1
     bot_id = f"bot-{uuid.uuid4().hex}"
-    bot_name = f"Bot {lobby['bot_counter']}"
-    lobby["players"][bot_id] = {
-        "id": bot_id,
-        "name": bot_name,
-        "score": STARTING_SCORE,
-        "choice": None,
-        "eliminated": False,
-        "is_bot": True,
-        "ready": True,
-    }
-    return bot_id, lobby["players"][bot_id]
+    bot_name = f"Bot {lobby.bot_counter}"
+    player = Player(
+        bot_id,
+        bot_name,
+        STARTING_SCORE,
+        is_bot=True,
+        ready=True,
+        strategy=bots.pick_strategy(BOT_STRATEGY_WEIGHTS),
+    )
+    add_player(lobby, player)
+    return bot_id, player
 
 
 def generate_bot_choice(lobby, bot_id):
-    _ = lobby, bot_id
-    return random.randint(0, 100)
+    """The bot's guess for this round; players without a strategy guess at random."""
+    return bots.choose(lobby, lobby.players[bot_id])
 
 
+@functools.lru_cache(maxsize=None)
 def get_active_rules(eliminations):
+    """Rules in force after ``eliminations`` eliminations, as a shared tuple."""
     rules = [BASE_RULE]
     for threshold in sorted(ELIMINATION_RULES):
         if eliminations >= threshold:
             rules.append(ELIMINATION_RULES[threshold])
-    return rules
+    return tuple(rules)
 
 
 def eliminate_player(lobby_id, lobby, player_id):
-    player = lobby["players"].get(player_id)
-    if not player or player.get("is_bot") or player.get("eliminated"):
+    player = lobby.players.get(player_id)
+    if not player or player.is_bot or player.eliminated:
         return None
 
-    previous_eliminations = lobby["eliminations"]
-    player["eliminated"] = True
-    player["choice"] = None
-    player["ready"] = False
-    if player["score"] > ELIMINATION_SCORE:
-        player["score"] = ELIMINATION_SCORE
-
-    lobby["eliminations"] += 1
-    elimination_number = lobby["eliminations"]
+    previous_eliminations = lobby.eliminations
+    if holds_up_ready(player):
+        lobby.unready_count -= 1
+    set_player_choice(lobby, player, None)
+    lobby.active_count -= 1
+    player.eliminated = True
+    player.ready = False
+    if player.score > ELIMINATION_SCORE:
+        player.score = ELIMINATION_SCORE
+    mark_player_changed(lobby, player_id)
+
+    lobby.eliminations += 1
+    elimination_number = lobby.eliminations
     unlocked_rules = [
         ELIMINATION_RULES.get(count)
         for count in range(previous_eliminations + 1, elimination_number + 1)
@@ -404,208 +1279,261 @@ def eliminate_player(lobby_id, lobby, player_id):
 
     return {
         "lobby_id": lobby_id,
-        "name": player["name"],
-        "score": player["score"],
+        "name": player.name,
+        "score": player.score,
         "eliminations": elimination_number,
         "active_rules": get_active_rules(elimination_number),
         "new_rules": unlocked_rules,
     }
 
 
+def start_round(lobby):
+    """Move the lobby on to its next round. The caller holds the lobby lock."""
+    lobby.round += 1
+    lobby.awaiting_choices = True
+    lobby.awaiting_next_round = False
+    unready_count = 0
+    for player in lobby.players.values():
+        player.choice = None
+        player.timed_out = False
+        if not player.is_bot:
+            player.ready = False
+            if holds_up_ready(player):
+                unready_count += 1
+    lobby.unready_count = unready_count
+    lobby.submitted_count = lobby.choice_sum = 0
+    mark_all_players_changed(lobby)
+
+
 def begin_round(lobby_id):
-    with lobbies_lock:
-        lobby = lobbies.get(lobby_id)
-        if not lobby or lobby["state"] != "running":
+    with locked_lobby(lobby_id) as lobby:
+        if not lobby or lobby.state != "running":
             return
 
-        active_players = get_active_players(lobby)
-        if len(active_players) <= 1:
+        if lobby.active_count <= 1:
             return
 
-        lobby["round"] += 1
-        lobby["awaiting_choices"] = True
-        lobby["awaiting_next_round"] = False
-        for player in lobby["players"].values():
-            player["choice"] = None
-            if not player.get("is_bot"):
-                player["ready"] = False
+        start_round(lobby)
+        deadline = schedule_round_deadline(lobby_id, lobby.round)
+        schedule_bot_turns(lobby_id, lobby)
 
-        round_number = lobby["round"]
+        round_number = lobby.round
+        eliminations = lobby.eliminations
         player_status = serialize_players(lobby, only_active=True)
-        has_bots = any(player.get("is_bot") for player in lobby["players"].values())
+        binary = lobby.binary_players > 0
 
-    socketio.emit(
+    emit_to_lobby(
+        lobby_id,
         "game_started",
         {
             "lobby_id": lobby_id,
             "round": round_number,
             "players": player_status,
-            "eliminations": lobby["eliminations"],
-            "active_rules": get_active_rules(lobby["eliminations"]),
+            "eliminations": eliminations,
+            "active_rules": get_active_rules(eliminations),
             "awaiting_choices": True,
+            "time_limit": ROUND_TIME_LIMIT,
+            "deadline": deadline,
         },
-        room=lobby_id,
+        binary,
     )
 
-    if has_bots:
-        socketio.start_background_task(run_bot_submissions, lobby_id)
-
     broadcast_lobby_update(lobby_id)
 
 
+@sampling_profiler.profiled("reset_lobby_state")
 def reset_lobby_state(lobby_id):
     eventlet.sleep(0.1)
-    with lobbies_lock:
-        lobby = lobbies.get(lobby_id)
+    with locked_lobby(lobby_id) as lobby:
         if not lobby:
             return
 
-        for player in lobby["players"].values():
-            player["score"] = STARTING_SCORE
-            player["choice"] = None
-            player["eliminated"] = False
-            player["ready"] = True if player.get("is_bot") else False
-
-        lobby["state"] = "waiting"
-        lobby["round"] = 0
-        lobby["eliminations"] = 0
-        lobby["awaiting_choices"] = False
-        lobby["awaiting_next_round"] = False
-
+        for player in lobby.players.values():
+            player.score = STARTING_SCORE
+            player.choice = None
+            player.timed_out = False
+            player.eliminated = False
+            player.ready = True if player.is_bot else False
+        lobby.unready_count = sum(
+            1 for player in lobby.players.values() if holds_up_ready(player)
+        )
+        lobby.active_count = len(lobby.players)
+        lobby.submitted_count = lobby.choice_sum = 0
+        mark_all_players_changed(lobby)
+
+        lobby.state = "waiting"
+        lobby.round = 0
+        lobby.eliminations = 0
+        lobby.awaiting_choices = False
+        lobby.awaiting_next_round = False
+        # Seats are not held between games (see disconnect_session_player).
+        detached = [sid for sid, player in lobby.players.items() if player.detached]
+
+    for sid in detached:
+        expire_detached_player(lobby_id, sid)
     broadcast_lobby_update(lobby_id)
 
 
-def evaluate_round(lobby_id):
-    elimination_notifications = []
-    round_payload = {}
-    game_over_payload = None
-
-    with lobbies_lock:
-        lobby = lobbies.get(lobby_id)
-        if not lobby or lobby["state"] != "running":
-            return
-
-        active_players = get_active_players(lobby)
-        if not active_players:
-            return
+def score_round(lobby_id, lobby):
+    """Apply the round's choices to the lobby in one pass over its players.
 
-        choices = [player["choice"] for player in active_players.values()]
-        if any(choice is None for choice in choices):
-            return
+    Returns ``(round_payload, elimination_notifications, game_over_payload)``,
+    or None if an active player still has to submit. The caller holds the
+    lobby lock.
+    """
+    active_ids = []
+    choices = []
+    for player_id, player in lobby.players.items():
+        if player.eliminated:
+            continue
+        if player.choice is None and not player.timed_out:
+            return None
+        active_ids.append(player_id)
+        choices.append(player.choice)
+    if not active_ids:
+        return None
 
-        average_value = sum(choices) / len(choices) if choices else 0.0
-        target = calculate_target(choices)
-        rule_result = apply_rules(lobby, target)
-        winners = rule_result["winners"]
-        base_loss = rule_result["base_loss"]
-        extra_penalties = rule_result["extra_penalties"]
-        disqualified = rule_result["disqualified"]
-        rule_messages = rule_result["rule_messages"]
-
-        scores_before = {
-            player["name"]: player["score"] for player in lobby["players"].values()
-        }
+    submitted_count = lobby.submitted_count
+    average_value = lobby.choice_sum / submitted_count if submitted_count else 0.0
+    target = target_from_total(lobby.choice_sum, submitted_count)
+    if submitted_count:
+        bots.record_round(lobby, average_value, min(c for c in choices if c is not None))
+    outcome = resolve_round(choices, lobby.eliminations, target)
+    winners = {active_ids[index] for index in outcome["winners"]}
+    disqualified = {active_ids[index] for index in outcome["disqualified"]}
+    base_loss = outcome["base_loss"]
+    rule_messages = outcome["rule_messages"]
+    if submitted_count < len(choices):
+        rule_messages.append(
+            f"Time ran out before every guess was in (-{TIMEOUT_PENALTY} penalty)."
+        )
 
-        for player_id, player in active_players.items():
+    scores_before = {}
+    scores_after = {}
+    submitted_numbers = {}
+    winner_names = []
+    disqualified_names = []
+    timed_out_names = []
+    eliminated_this_round = []
+    for player_id, player in lobby.players.items():
+        name = player.name
+        scores_before[name] = player.score
+        if player.choice is not None:
+            submitted_numbers[name] = player.choice
+        if not player.eliminated:
             if player_id in winners:
-                continue
-            penalty = base_loss + extra_penalties.get(player_id, 0)
-            player["score"] -= penalty
-            player["penalty"] = penalty
-            if player["score"] < ELIMINATION_SCORE:
-                player["score"] = ELIMINATION_SCORE
-
-        submitted_numbers = {
-            player["name"]: player["choice"]
-            for player in lobby["players"].values()
-            if player["choice"] is not None
-        }
-
-        eliminated_this_round = []
-        for player_id, player in active_players.items():
-            if player["score"] <= ELIMINATION_SCORE and not player["eliminated"]:
-                player["eliminated"] = True
-                player["score"] = ELIMINATION_SCORE
-                lobby["eliminations"] += 1
-                elimination_number = lobby["eliminations"]
-                eliminated_this_round.append(
-                    {
-                        "player_id": player_id,
-                        "name": player["name"],
-                        "score": player["score"],
-                        "elimination_number": elimination_number,
-                        "is_bot": player.get("is_bot", False),
-                    }
-                )
-
-        lobby["awaiting_choices"] = False
+                winner_names.append(name)
+            else:
+                penalty = base_loss
+                if player_id in disqualified:
+                    penalty += DUPLICATE_PENALTY
+                    disqualified_names.append(name)
+                if player.choice is None:
+                    penalty += TIMEOUT_PENALTY
+                    timed_out_names.append(name)
+                player.score -= penalty
+                player.penalty = penalty
+                if player.score < ELIMINATION_SCORE:
+                    player.score = ELIMINATION_SCORE
+            if player.score <= ELIMINATION_SCORE:
+                if holds_up_ready(player):
+                    lobby.unready_count -= 1
+                lobby.active_count -= 1
+                player.eliminated = True
+                player.score = ELIMINATION_SCORE
+                lobby.eliminations += 1
+                eliminated_this_round.append((name, player.score, lobby.eliminations))
+        scores_after[name] = player.score
+
+    lobby.awaiting_choices = False
+    # Scores changed here and choices are cleared below.
+    mark_all_players_changed(lobby)
+
+    round_payload = {
+        "lobby_id": lobby_id,
+        "round": lobby.round,
+        "target": target,
+        "average": average_value,
+        "winners": winner_names,
+        "choices": submitted_numbers,
+        "scores_before": scores_before,
+        "scores_after": scores_after,
+        "disqualified": disqualified_names,
+        "timed_out": timed_out_names,
+        "rule_messages": rule_messages,
+        "players_after": serialize_players(lobby),
+        "eliminations": lobby.eliminations,
+        "active_rules": get_active_rules(lobby.eliminations),
+        "awaiting_choices": False,
+    }
 
-        scores_after = {
-            player["name"]: player["score"] for player in lobby["players"].values()
-        }
-        winner_names = [
-            lobby["players"][player_id]["name"] for player_id in winners
-        ]
-        disqualified_names = [
-            lobby["players"][player_id]["name"] for player_id in disqualified
+    elimination_notifications = []
+    if eliminated_this_round:
+        initial_eliminations = lobby.eliminations - len(eliminated_this_round) + 1
+        unlocked_rules = [
+            ELIMINATION_RULES.get(count)
+            for count in range(initial_eliminations, lobby.eliminations + 1)
+            if ELIMINATION_RULES.get(count)
         ]
+        for name, score, elimination_number in eliminated_this_round:
+            elimination_notifications.append(
+                {
+                    "lobby_id": lobby_id,
+                    "name": name,
+                    "score": score,
+                    "eliminations": elimination_number,
+                    "active_rules": get_active_rules(elimination_number),
+                    "new_rules": unlocked_rules,
+                }
+            )
 
-        round_payload = {
+    game_over_payload = None
+    winner = check_winner(lobby)
+    if winner:
+        lobby.state = "finished"
+        game_over_payload = {
             "lobby_id": lobby_id,
-            "round": lobby["round"],
-            "target": target,
-            "average": average_value,
-            "winners": winner_names,
-            "choices": submitted_numbers,
-            "scores_before": scores_before,
-            "scores_after": scores_after,
-            "disqualified": disqualified_names,
-            "rule_messages": rule_messages,
-            "players_after": serialize_players(lobby),
-            "eliminations": lobby["eliminations"],
-            "active_rules": get_active_rules(lobby["eliminations"]),
-            "awaiting_choices": lobby.get("awaiting_choices", False),
+            "winner": winner.name,
+            "score": winner.score,
         }
+    else:
+        lobby.awaiting_next_round = True
 
-        if eliminated_this_round:
-            initial_eliminations = lobby["eliminations"] - len(eliminated_this_round) + 1
-            eliminated_this_round.sort(key=lambda x: x["elimination_number"])
-            unlocked_rules = [
-                ELIMINATION_RULES.get(count)
-                for count in range(initial_eliminations, lobby["eliminations"] + 1)
-                if ELIMINATION_RULES.get(count)
-            ]
-
-            for eliminated in eliminated_this_round:
-                elimination_number = eliminated.get("elimination_number", lobby["eliminations"])
-                elimination_notifications.append(
-                    {
-                        "lobby_id": lobby_id,
-                        "name": eliminated["name"],
-                        "score": eliminated["score"],
-                        "eliminations": elimination_number,
-                        "active_rules": get_active_rules(elimination_number),
-                        "new_rules": unlocked_rules,
-                    }
-                )
+    for player in lobby.players.values():
+        player.choice = None
+        player.timed_out = False
+    lobby.submitted_count = lobby.choice_sum = 0
+
+    return round_payload, elimination_notifications, game_over_payload
 
-        winner = check_winner(lobby)
-        if winner:
-            lobby["state"] = "finished"
-            game_over_payload = {
-                "lobby_id": lobby_id,
-                "winner": winner["name"],
-                "score": winner["score"],
-            }
-        else:
-            lobby["awaiting_next_round"] = True
 
-        for player in lobby["players"].values():
-            player["choice"] = None
+@sampling_profiler.profiled("evaluate_round")
+def evaluate_round(lobby_id):
+    with metrics.EVALUATE_ROUND_SECONDS.time():
+        run_evaluate_round(lobby_id)
+
+
+def run_evaluate_round(lobby_id):
+    with locked_lobby(lobby_id) as lobby:
+        if not lobby or lobby.state != "running":
+            return
+        result = score_round(lobby_id, lobby)
+        if not result:
+            return
+        round_payload, elimination_notifications, game_over_payload = result
+        if round_payload:
+            round_payload = EncodedPayload(
+                round_payload, awaiting_next_round=game_over_payload is None
+            )
+        if lobby.spectators:
+            if round_payload:
+                lobby.spectator_events["round_result"] = round_payload
+            if game_over_payload:
+                lobby.spectator_events["game_over"] = game_over_payload
+        binary = lobby.binary_players > 0
 
     if round_payload:
-        round_payload["awaiting_next_round"] = game_over_payload is None
-        socketio.emit("round_result", round_payload, room=lobby_id)
+        emit_to_lobby(lobby_id, "round_result", round_payload, binary)
 
     for elimination in elimination_notifications:
         socketio.emit("player_eliminated", elimination, room=lobby_id)
@@ -617,110 +1545,396 @@ def evaluate_round(lobby_id):
         broadcast_lobby_update(lobby_id)
 
 
-def run_bot_submissions(lobby_id):
-    eventlet.sleep(random.uniform(0.6, 1.2))
+def schedule_bot_turns(lobby_id, lobby):
+    """Queue a submission for every active bot, staggered like a human table."""
+    global bot_scheduler_started
+    bot_ids = [
+        player_id
+        for player_id in lobby.bot_ids
+        if not lobby.players[player_id].eliminated
+    ]
+    first = random.uniform(*BOT_FIRST_DELAY)
+    window = len(bot_ids) * sum(BOT_NEXT_DELAY) / 2
+    if ROUND_TIME_LIMIT > 0:
+        latest = BOT_WINDOW_FRACTION * ROUND_TIME_LIMIT
+        first = min(first, latest)
+        window = min(window, latest - first)
+    start = time.monotonic() + first
+    for player_id in bot_ids:
+        due = start + random.uniform(0, window)
+        heapq.heappush(bot_turns, (due, lobby_id, lobby.round, player_id))
+    if not bot_scheduler_started:
+        bot_scheduler_started = True
+        socketio.start_background_task(run_bot_scheduler)
+
+
+def run_bot_scheduler():
     while True:
-        should_evaluate = False
-        with lobbies_lock:
-            lobby = lobbies.get(lobby_id)
+        now = time.monotonic()
+        batches = defaultdict(list)
+        while bot_turns and bot_turns[0][0] <= now:
+            _, lobby_id, round_number, bot_id = heapq.heappop(bot_turns)
+            batches[lobby_id].append((round_number, bot_id))
+        for lobby_id, turns in batches.items():
+            submit_bot_turns(lobby_id, turns)
+        delay = BOT_SCHEDULER_RESOLUTION
+        if bot_turns:
+            delay = min(delay, bot_turns[0][0] - now)
+        eventlet.sleep(max(delay, 0))
+
+
+@sampling_profiler.profiled("submit_bot_turns")
+def submit_bot_turns(lobby_id, turns):
+    """Submit every due bot of one lobby under a single hold of its lock."""
+    with locked_lobby(lobby_id, touch=False) as lobby:
+        if not lobby or lobby.state != "running" or not lobby.awaiting_choices:
+            return
+        submitted = False
+        for round_number, bot_id in turns:
+            bot = lobby.players.get(bot_id)
             if (
-                not lobby
-                or lobby["state"] != "running"
-                or not lobby.get("awaiting_choices")
+                round_number != lobby.round
+                or not bot
+                or bot.eliminated
+                or bot.choice is not None
             ):
-                return
+                continue
+            set_player_choice(lobby, bot, generate_bot_choice(lobby, bot_id))
+            submitted = True
+        if not submitted:
+            return
+        should_evaluate = round_complete(lobby)
 
-            pending_bots = [
-                (player_id, player)
-                for player_id, player in lobby["players"].items()
-                if player.get("is_bot")
-                and not player["eliminated"]
-                and player["choice"] is None
-            ]
+    if should_evaluate:
+        socketio.start_background_task(evaluate_round, lobby_id)
+    else:
+        request_broadcast(lobby_id, "lobby_update")
 
-            if not pending_bots:
-                return
 
-            bot_id, bot = pending_bots[0]
-            bot["choice"] = generate_bot_choice(lobby, bot_id)
+def schedule_round_deadline(lobby_id, round_number):
+    """Queue the round's deadline and return it in epoch milliseconds."""
+    global round_timer_started
+    if ROUND_TIME_LIMIT <= 0:
+        return None
+    heapq.heappush(
+        round_deadlines, (time.monotonic() + ROUND_TIME_LIMIT, lobby_id, round_number)
+    )
+    if not round_timer_started:
+        round_timer_started = True
+        socketio.start_background_task(run_round_timer)
+    return int((time.time() + ROUND_TIME_LIMIT) * 1000)
+
+
+def run_round_timer():
+    while True:
+        now = time.monotonic()
+        while round_deadlines and round_deadlines[0][0] <= now:
+            _, lobby_id, round_number = heapq.heappop(round_deadlines)
+            socketio.start_background_task(expire_round, lobby_id, round_number)
+        delay = ROUND_TIMER_RESOLUTION
+        if round_deadlines:
+            delay = min(delay, round_deadlines[0][0] - now)
+        eventlet.sleep(max(delay, 0))
+
+
+@sampling_profiler.profiled("expire_round")
+def expire_round(lobby_id, round_number):
+    with locked_lobby(lobby_id, touch=False) as lobby:
+        if (
+            not lobby
+            or lobby.state != "running"
+            or not lobby.awaiting_choices
+            or lobby.round != round_number
+        ):
+            return
+        for player_id, player in get_active_players(lobby).items():
+            if player.choice is not None:
+                continue
+            if ROUND_TIMEOUT_POLICY == "random":
+                set_player_choice(lobby, player, generate_bot_choice(lobby, player_id))
+            else:
+                player.timed_out = True
+    evaluate_round(lobby_id)
 
-            should_evaluate = all(
-                player["choice"] is not None
-                for player in lobby["players"].values()
-                if not player["eliminated"]
-            )
 
-        if should_evaluate:
-            evaluate_round(lobby_id)
+def remove_session_player(lobby_id, sid):
+    """Take ``sid`` out of its lobby and notify the players that remain."""
+    elimination_notice = None
+    should_evaluate = False
+    typing_update = False
+    with locked_lobby(lobby_id) as lobby:
+        if not lobby:
             return
+        player = lobby.players.get(sid)
+        if not player:
+            remove_spectator(lobby_id, lobby, sid)
+            return
+        if lobby.state == "running":
+            elimination_notice = eliminate_player(lobby_id, lobby, sid)
+        discard_player(lobby, sid)
+        unregister_session(lobby_id, lobby, sid, player.client_id)
+        tracker = lobby.typing_players
+        if tracker.pop(sid, None) is not None:
+            typing_update = True
+        if lobby.returning_host == player.client_id:
+            lobby.returning_host = None
+        if lobby.host_id == sid:
+            assign_new_host(lobby)
+        leave_room(lobby_id, sid=sid)
+        for room in member_rooms(lobby_id, player.delta_updates, player.binary):
+            leave_room(room, sid=sid)
+        remaining_active = lobby.active_count
+        for other_id, other in lobby.players.items():
+            if other.is_bot or other.eliminated or other.ready:
+                continue
+            other.ready = True
+            mark_player_changed(lobby, other_id)
+        lobby.unready_count = 0
+
+        if lobby.state == "running" and remaining_active <= 1:
+            winner = check_winner(lobby)
+            if winner:
+                lobby.state = "finished"
+                payload = {
+                    "lobby_id": lobby_id,
+                    "winner": winner.name,
+                    "score": winner.score,
+                }
+                socketio.emit("game_over", payload, room=lobby_id)
+                if lobby.spectators:
+                    lobby.spectator_events["game_over"] = payload
+                socketio.start_background_task(reset_lobby_state, lobby_id)
+        elif lobby.state == "running" and lobby.awaiting_choices and round_complete(lobby):
+            should_evaluate = True
+
+    broadcast_lobby_update(lobby_id)
+    if elimination_notice:
+        socketio.emit("player_eliminated", elimination_notice, room=lobby_id)
+    if should_evaluate:
+        evaluate_round(lobby_id)
+    if typing_update:
+        request_broadcast(lobby_id, "typing_state")
 
-        eventlet.sleep(random.uniform(0.4, 0.9))
 
+def disconnect_session_player(lobby_id, sid):
+    """Hold a disconnected player's seat for RESUME_GRACE_PERIOD, or remove them.
 
-@socketio.on("connect")
-def handle_connect():
+    Seats are only held mid-game: in a waiting lobby a detached player would
+    still count towards starting. A detached host lends the role to a
+    connected player until it resumes, so the next round can still start.
+    Only clients that sent a client_id can resume, since the rejoin finds the
+    seat by it.
+    """
+    typing_update = False
+    with locked_lobby(lobby_id) as lobby:
+        if not lobby:
+            return
+        player = lobby.players.get(sid)
+        if not player:
+            remove_spectator(lobby_id, lobby, sid)
+            return
+        resumable = (
+            RESUME_GRACE_PERIOD > 0
+            and lobby.state == "running"
+            and not player.is_bot
+            and player.client_id != sid
+        )
+        if resumable:
+            if holds_up_ready(player):
+                lobby.unready_count -= 1
+            player.detached = True
+            if lobby.host_id == sid:
+                # A host that was only lent the role leaves it to the owner.
+                if lobby.returning_host is None:
+                    lobby.returning_host = player.client_id
+                assign_new_host(lobby)
+            unregister_session(lobby_id, lobby, sid)
+            typing_update = lobby.typing_players.pop(sid, None) is not None
+            schedule_resume_deadline(lobby_id, sid)
+    if not resumable:
+        remove_session_player(lobby_id, sid)
+    elif typing_update:
+        request_broadcast(lobby_id, "typing_state")
+
+
+def schedule_resume_deadline(lobby_id, sid):
+    global resume_timer_started
+    heapq.heappush(resume_deadlines, (time.monotonic() + RESUME_GRACE_PERIOD, lobby_id, sid))
+    if not resume_timer_started:
+        resume_timer_started = True
+        socketio.start_background_task(run_resume_timer)
+
+
+def run_resume_timer():
+    while True:
+        now = time.monotonic()
+        while resume_deadlines and resume_deadlines[0][0] <= now:
+            _, lobby_id, sid = heapq.heappop(resume_deadlines)
+            socketio.start_background_task(expire_detached_player, lobby_id, sid)
+        eventlet.sleep(RESUME_TIMER_RESOLUTION)
+
+
+def expire_detached_player(lobby_id, sid):
+    with locked_lobby(lobby_id, touch=False) as lobby:
+        player = lobby.players.get(sid) if lobby else None
+        if not player or not player.detached:
+            return
+    # remove_session_player() leaves rooms, which needs a request context.
+    with app.test_request_context("/"):
+        request.namespace = "/"
+        remove_session_player(lobby_id, sid)
+
+
+def reattach_player(lobby_id, lobby, client_id, sid, player_name, delta_updates, binary):
+    """Give ``client_id``'s seat in the lobby to ``sid``. The caller holds the lobby lock.
+
+    Like the old duplicate-client check, both the client_id and the display
+    name (normalized) have to match the seat. The seat keeps its score, choice
+    and host role, mid-game too, and takes back a host role lent out while it
+    was detached. Returns the player and the sid of another socket of the
+    client still attached to the seat (to be disconnected), or ``(None, None)``
+    if the client has no seat here.
+    """
+    old_sid = lobby.client_sids.get(client_id) if client_id else None
+    player = lobby.players.get(old_sid)
+    if not player or player.is_bot:
+        return None, None
+    if normalize_display_name(player_name) != normalize_display_name(player.name):
+        return None, None
+    stale_sid = None
+    if old_sid == sid:
+        for room in member_rooms(lobby_id, player.delta_updates, player.binary):
+            leave_room(room, sid=sid)
+    else:
+        if not player.detached:
+            stale_sid = old_sid
+            unregister_session(lobby_id, lobby, old_sid)
+            lobby.typing_players.pop(old_sid, None)
+        # Rebuilt rather than re-keyed in place so the join order stays the same.
+        lobby.players = {
+            (sid if player_id == old_sid else player_id): other
+            for player_id, other in lobby.players.items()
+        }
+        player.id = sid
+        lobby.human_names[normalize_display_name(player.name)] = sid
+        # Clients see the old id leave and the new one join.
+        lobby.changed_players.pop(old_sid, None)
+        lobby.removed_players[old_sid] = None
+        if lobby.host_id == old_sid:
+            lobby.host_id = sid
+    if player.detached:
+        player.detached = False
+        if holds_up_ready(player):
+            lobby.unready_count += 1
+    if lobby.returning_host == client_id:
+        lobby.returning_host = None
+        set_host(lobby, sid)
+    elif not host_is_connected(lobby):
+        # Nobody connected holds the role (e.g. after a restore); lend it to
+        # this player until the host's own client resumes.
+        host = lobby.players.get(lobby.host_id)
+        if host and host.detached and lobby.returning_host is None:
+            lobby.returning_host = host.client_id
+        set_host(lobby, sid)
+    count_wire_mode(lobby, player, -1)
+    player.delta_updates = delta_updates
+    player.binary = binary
+    count_wire_mode(lobby, player, 1)
+    if lobby.state == "waiting":
+        player.name = player_name
+    mark_player_changed(lobby, sid)
+    return player, stale_sid
+
+
+def socket_event(event_name):
+    """Register a Socket.IO handler whose run time is recorded in the metrics."""
+    def decorator(handler):
+        profiled_handler = sampling_profiler.profiled(event_name)(handler)
+
+        @socketio.on(event_name)
+        @functools.wraps(handler)
+        def timed(*args):
+            with metrics.HANDLER_SECONDS.time(event_name):
+                return profiled_handler(*args)
+
+        return handler
+
+    return decorator
+
+
+def lobby_event(event_name):
+    """Register a Socket.IO handler that runs on the worker owning the lobby.
+
+    Events for a lobby sharded to another worker are forwarded to it and run
+    there by run_forwarded_event(). Events in RATE_LIMITS are checked against
+    the sender's bucket before forwarding and the lobby's bucket on the owner.
+    """
+    def decorator(handler):
+        @functools.wraps(handler)
+        def run_limited(data, lobby_id):
+            if not event_limits.allow_lobby(event_name, lobby_id):
+                return reject_rate_limited(event_name)
+            return handler(data)
+
+        lobby_handlers[event_name] = run_limited
+
+        @socket_event(event_name)
+        @functools.wraps(handler)
+        def route(data):
+            if not event_limits.allow_sid(event_name, request.sid):
+                return reject_rate_limited(event_name)
+            lobby_id = resolve_lobby_id(data or {}, request.sid)
+            if cluster.owns(lobby_id):
+                return run_limited(data, lobby_id)
+            cluster.forward(lobby_id, event_name, request.sid, data)
+            return None
+
+        return handler
+
+    return decorator
+
+
+def reject_rate_limited(event_name):
+    metrics.RATE_LIMITED.inc(event_name)
+    message = RATE_LIMIT_MESSAGES.get(event_name)
+    if message:
+        emit("error", {"message": message})
+
+
+def run_forwarded_event(message):
+    socketio.start_background_task(handle_forwarded_event, message)
+
+
+def handle_forwarded_event(message):
+    with app.test_request_context("/"):
+        request.sid = message["sid"]
+        request.namespace = "/"
+        if message["event"] == "disconnect":
+            disconnect_session_player(message["lobby_id"], message["sid"])
+            return
+        handler = lobby_handlers.get(message["event"])
+        if handler:
+            handler(message["data"], message["lobby_id"])
+
+
+@socket_event("connect")
+def handle_connect(auth=None):
     emit("connected", {"sid": request.sid})
 
 
-@socketio.on("disconnect")
-def handle_disconnect():
-    removed_lobby_id = None
-    elimination_notice = None
-    should_evaluate = False
-    typing_update_id = None
-    with lobbies_lock:
-        for lobby_id, lobby in lobbies.items():
-            if request.sid in lobby["players"]:
-                player = lobby["players"].get(request.sid)
-                if lobby["state"] == "running":
-                    elimination_notice = eliminate_player(lobby_id, lobby, request.sid)
-                lobby["players"].pop(request.sid, None)
-                tracker = ensure_typing_tracker(lobby)
-                if tracker.pop(request.sid, None) is not None:
-                    typing_update_id = lobby_id
-                if lobby["host_id"] == request.sid:
-                    assign_new_host(lobby)
-                leave_room(lobby_id)
-                remaining_active = len(get_active_players(lobby))
-                for other in lobby["players"].values():
-                    if other.get("is_bot") or other.get("eliminated"):
-                        continue
-                    other["ready"] = True
-
-                if lobby["state"] == "running" and remaining_active <= 1:
-                    winner = check_winner(lobby)
-                    if winner:
-                        lobby["state"] = "finished"
-                        payload = {
-                            "lobby_id": lobby_id,
-                            "winner": winner["name"],
-                            "score": winner["score"],
-                        }
-                        socketio.emit("game_over", payload, room=lobby_id)
-                        socketio.start_background_task(reset_lobby_state, lobby_id)
-                elif (
-                    lobby["state"] == "running"
-                    and lobby.get("awaiting_choices")
-                    and all(
-                        p["choice"] is not None
-                        for p in lobby["players"].values()
-                        if not p["eliminated"]
-                    )
-                ):
-                    should_evaluate = True
-                removed_lobby_id = lobby_id
-                break
-    if removed_lobby_id:
-        broadcast_lobby_update(removed_lobby_id)
-    if elimination_notice:
-        socketio.emit("player_eliminated", elimination_notice, room=removed_lobby_id)
-    if should_evaluate and removed_lobby_id:
-        evaluate_round(removed_lobby_id)
-    if typing_update_id:
-        emit_typing_state(typing_update_id)
+@socket_event("disconnect")
+def handle_disconnect(reason=None):
+    event_limits.forget_sid(request.sid)
+    lobby_id = get_session_lobby_id(request.sid)
+    if not lobby_id:
+        return
+    if cluster.owns(lobby_id):
+        disconnect_session_player(lobby_id, request.sid)
+    else:
+        cluster.forward(lobby_id, "disconnect", request.sid, None)
 
 
-@socketio.on("create_lobby")
+@socket_event("create_lobby")
 def handle_create_lobby(data):
     player_name = str(data.get("player_name", "")).strip()
     if not player_name:
@@ -728,46 +1942,70 @@ def handle_create_lobby(data):
         return
     player_name = player_name[:MAX_NAME_LENGTH]
     client_id = normalize_client_id(data.get("client_id")) or request.sid
+    wire_encoding = encoding.negotiate(data.get("encoding"))
+    binary = wire_encoding == encoding.MSGPACK
+    delta_updates = bool(data.get("delta_updates")) or binary
+    capacity = parse_capacity(data.get("max_players"))
 
     lobby_id = None
-    with lobbies_lock:
-        for _ in range(12):
-            candidate = generate_lobby_code()
-            if candidate not in lobbies:
-                lobby_id = candidate
-                create_lobby_if_missing(candidate)
-                break
-
-    if not lobby_id:
+    try:
+        while not lobby_id:
+            candidate = lobby_codes.allocate()
+            with lobbies_lock:
+                # Codes leave the allocator unused; this only guards against a
+                # lobby created under the same code in the meantime.
+                if candidate not in lobbies:
+                    lobby_id = candidate
+                    create_lobby_if_missing(candidate)
+    except CodeSpaceExhausted:
         emit("error", {"message": "Unable to create a lobby right now. Please try again."})
         return
+    if lobby_codes.needs_refill():
+        socketio.start_background_task(lobby_codes.refill)
 
     join_room(lobby_id)
 
     with lobbies_lock:
         lobby = lobbies.get(lobby_id) or create_lobby_if_missing(lobby_id)
-        lobby["players"][request.sid] = {
-            "id": request.sid,
-            "name": player_name,
-            "score": STARTING_SCORE,
-            "choice": None,
-            "eliminated": False,
-            "client_id": client_id,
-            "ready": False,
-        }
-        lobby["host_id"] = request.sid
 
-    emit("lobby_created", {"lobby_id": lobby_id}, room=request.sid)
-    emit_chat_history(lobby_id, request.sid)
-    broadcast_lobby_update(lobby_id)
+    with lobby.lock:
+        lobby.capacity = capacity
+        add_player(
+            lobby,
+            Player(
+                request.sid,
+                player_name,
+                STARTING_SCORE,
+                client_id=client_id,
+                delta_updates=delta_updates,
+                binary=binary,
+            ),
+        )
+        set_host(lobby, request.sid)
+        previous_lobby_id = register_session(lobby_id, lobby, request.sid, client_id)
+
+    if previous_lobby_id and previous_lobby_id != lobby_id:
+        remove_session_player(previous_lobby_id, request.sid)
+
+    for room in member_rooms(lobby_id, delta_updates, binary):
+        join_room(room)
+    emit("lobby_created", {"lobby_id": lobby_id, "encoding": wire_encoding}, room=request.sid)
+    emit_chat_history(lobby_id, request.sid, parse_chat_since(data.get("chat_since")))
+    broadcast_lobby_update(lobby_id, snapshot_sid=request.sid if delta_updates else None)
 
 
-@socketio.on("join_lobby")
+@lobby_event("join_lobby")
 def handle_join_lobby(data):
     raw_lobby_id = data.get("lobby_id")
     lobby_id = normalize_lobby_code(raw_lobby_id)
     player_name = str(data.get("player_name", "")).strip()
     client_id = normalize_client_id(data.get("client_id")) or request.sid
+    wire_encoding = encoding.negotiate(data.get("encoding"))
+    binary = wire_encoding == encoding.MSGPACK
+    delta_updates = bool(data.get("delta_updates")) or binary
+    since_version = data.get("since_version")
+    if not isinstance(since_version, int) or isinstance(since_version, bool):
+        since_version = None
 
     if not player_name:
         emit("error", {"message": "player_name is required"})
@@ -780,98 +2018,131 @@ def handle_join_lobby(data):
     player_name = player_name[:MAX_NAME_LENGTH]
 
     join_room(lobby_id)
-    duplicate_sids = []
-    host_replaced = False
-
-    with lobbies_lock:
-        lobby = lobbies.get(lobby_id)
-        if not lobby:
-            if lobby_id == "DEFAULT":
-                lobby = create_lobby_if_missing(lobby_id)
-            else:
-                leave_room(lobby_id)
-                emit(
-                    "error",
-                    {"message": "Lobby code not found. Double-check the code and try again."},
-                )
-                return
+    resume_delta = None
 
-        if lobby["state"] == "running" or lobby["state"] == "finished":
-            leave_room(lobby_id)
-            emit("error", {"message": "Lobby is full or already in progress."})
-            return
+    lobby = get_lobby(lobby_id)
+    if not lobby and lobby_id == "DEFAULT":
+        with lobbies_lock:
+            lobby = create_lobby_if_missing(lobby_id)
 
-        duplicates, replaced_host = remove_duplicate_clients(lobby, client_id, player_name, request.sid)
-        duplicate_sids.extend(duplicates)
-        host_replaced = host_replaced or replaced_host
+    if not lobby:
+        leave_room(lobby_id)
+        emit(
+            "error",
+            {"message": "Lobby code not found. Double-check the code and try again."},
+        )
+        return
 
-        if is_name_taken(lobby, player_name):
+    with lobby.lock:
+        if lobby.closed:
             leave_room(lobby_id)
             emit(
                 "error",
-                {
-                    "message": "Dieser Anzeigename ist bereits vergeben. Bitte wähle einen anderen."
-                },
+                {"message": "Lobby code not found. Double-check the code and try again."},
             )
             return
 
-        while len(lobby["players"]) >= MIN_PLAYERS:
-            bot_candidates = [
-                player_id
-                for player_id, player in lobby["players"].items()
-                if player.get("is_bot")
-            ]
-            if not bot_candidates:
+        # A client that already has a seat here (it reconnected, was restored
+        # from the lobby log, or opened a second tab) takes it over, mid-game too.
+        player, stale_sid = reattach_player(
+            lobby_id, lobby, client_id, request.sid, player_name, delta_updates, binary
+        )
+        resumed = player is not None
+        if resumed and delta_updates and since_version is not None:
+            resume_delta = lobby_delta_since(lobby_id, lobby, since_version)
+        if not resumed:
+            if lobby.state == "running" or lobby.state == "finished":
                 leave_room(lobby_id)
                 emit("error", {"message": "Lobby is full or already in progress."})
                 return
-            lobby["players"].pop(bot_candidates[0], None)
 
-        lobby["players"][request.sid] = {
-            "id": request.sid,
-            "name": player_name,
-            "score": STARTING_SCORE,
-            "choice": None,
-            "eliminated": False,
-            "client_id": client_id,
-            "ready": False,
-        }
+            if is_name_taken(lobby, player_name):
+                leave_room(lobby_id)
+                emit(
+                    "error",
+                    {
+                        "message": "Dieser Anzeigename ist bereits vergeben. Bitte wähle einen anderen."
+                    },
+                )
+                return
 
-        if host_replaced or lobby["host_id"] is None:
-            lobby["host_id"] = request.sid
+            # A full lobby gives up its oldest bot for a human.
+            if len(lobby.players) >= lobby.capacity:
+                if not lobby.bot_ids:
+                    leave_room(lobby_id)
+                    emit("error", {"message": "Lobby is full or already in progress."})
+                    return
+                discard_player(lobby, next(iter(lobby.bot_ids)))
+
+            add_player(
+                lobby,
+                Player(
+                    request.sid,
+                    player_name,
+                    STARTING_SCORE,
+                    client_id=client_id,
+                    delta_updates=delta_updates,
+                    binary=binary,
+                ),
+            )
 
-    emit("joined_lobby", {"lobby_id": lobby_id}, room=request.sid)
-    emit_chat_history(lobby_id, request.sid)
-    broadcast_lobby_update(lobby_id)
+            if lobby.host_id is None:
+                set_host(lobby, request.sid)
+        remove_spectator(lobby_id, lobby, request.sid)
+        previous_lobby_id = register_session(lobby_id, lobby, request.sid, client_id)
+        # Joined before the snapshot is taken so no delta after it is missed.
+        for room in member_rooms(lobby_id, delta_updates, binary):
+            join_room(room)
+        if resume_delta is None:
+            snapshot = lobby_snapshot(lobby_id, lobby)
+
+    if previous_lobby_id and previous_lobby_id != lobby_id:
+        remove_session_player(previous_lobby_id, request.sid)
+
+    emit(
+        "joined_lobby",
+        {"lobby_id": lobby_id, "encoding": wire_encoding, "resumed": resumed},
+        room=request.sid,
+    )
+    emit_chat_history(lobby_id, request.sid, parse_chat_since(data.get("chat_since")))
+    # Only the joiner needs the whole lobby; everyone else (the joiner too)
+    # gets the seat change with the next coalesced update.
+    if resume_delta is None:
+        socketio.emit(
+            "lobby_update", encode_for(binary, "lobby_update", snapshot), room=request.sid
+        )
+    else:
+        socketio.emit(
+            "lobby_delta", encode_for(binary, "lobby_delta", resume_delta), room=request.sid
+        )
+    request_broadcast(lobby_id, "lobby_update")
 
-    for sid in duplicate_sids:
-        socketio.server.disconnect(sid)
+    if stale_sid:
+        socketio.server.disconnect(stale_sid)
 
 
-@socketio.on("host_start_round")
+@lobby_event("host_start_round")
 def handle_host_start_round(data):
-    lobby_id = normalize_lobby_code(data.get("lobby_id")) or "DEFAULT"
-    with lobbies_lock:
-        lobby = lobbies.get(lobby_id)
+    lobby_id = resolve_lobby_id(data, request.sid)
+    with locked_lobby(lobby_id) as lobby:
         if not lobby:
             emit("error", {"message": "Lobby not found."})
             return
 
-        if lobby.get("host_id") != request.sid:
+        if lobby.host_id != request.sid:
             emit("error", {"message": "Only the host can start rounds."})
             return
 
-        if lobby["state"] == "finished":
+        if lobby.state == "finished":
             emit("error", {"message": "Game has already finished."})
             return
 
-        active_players = get_active_players(lobby)
-        if len(active_players) < 2:
+        if lobby.active_count < 2:
             emit("error", {"message": "Not enough active players to continue."})
             return
 
-        if lobby["state"] == "waiting":
-            if len(lobby["players"]) < MIN_PLAYERS:
+        if lobby.state == "waiting":
+            if len(lobby.players) < MIN_PLAYERS:
                 emit(
                     "error",
                     {
@@ -882,47 +2153,49 @@ def handle_host_start_round(data):
             if not all_active_players_ready(lobby):
                 emit("error", {"message": "Waiting for every player to be ready."})
                 return
-            lobby["state"] = "running"
-        elif not lobby.get("awaiting_next_round"):
+            lobby.state = "running"
+        elif not lobby.awaiting_next_round:
             emit("error", {"message": "Round already in progress."})
             return
         elif not all_active_players_ready(lobby):
             emit("error", {"message": "Waiting for every player to be ready."})
             return
 
-        lobby["awaiting_next_round"] = False
+        lobby.awaiting_next_round = False
 
     begin_round(lobby_id)
 
 
-@socketio.on("fill_with_bots")
+@lobby_event("fill_with_bots")
 def handle_fill_with_bots(data):
-    lobby_id = normalize_lobby_code(data.get("lobby_id")) or "DEFAULT"
+    lobby_id = resolve_lobby_id(data, request.sid)
     requested = data.get("count")
 
-    with lobbies_lock:
-        lobby = lobbies.get(lobby_id)
+    with locked_lobby(lobby_id) as lobby:
         if not lobby:
             emit("error", {"message": "Lobby not found."})
             return
 
-        if lobby.get("host_id") != request.sid:
+        if lobby.host_id != request.sid:
             emit("error", {"message": "Only the host can add bots."})
             return
 
-        if lobby["state"] == "running" and lobby.get("awaiting_choices"):
+        if lobby.state == "running" and lobby.awaiting_choices:
             emit("error", {"message": "Wait for the round to finish before adding bots."})
             return
 
-        available_slots = max(0, MIN_PLAYERS - len(lobby["players"]))
+        available_slots = max(0, lobby.capacity - len(lobby.players))
         if available_slots <= 0:
             emit("error", {"message": "Lobby already has the maximum number of players."})
             return
 
+        # Without a count, fill up to the players needed to start, not to
+        # the lobby's capacity.
+        default_count = max(0, MIN_PLAYERS - len(lobby.players))
         try:
-            requested_count = int(requested) if requested is not None else available_slots
+            requested_count = int(requested) if requested is not None else default_count
         except (TypeError, ValueError):
-            requested_count = available_slots
+            requested_count = default_count
 
         bots_to_add = max(0, min(requested_count, available_slots))
         if bots_to_add == 0:
@@ -935,9 +2208,9 @@ def handle_fill_with_bots(data):
     broadcast_lobby_update(lobby_id)
 
 
-@socketio.on("send_chat_message")
+@lobby_event("send_chat_message")
 def handle_send_chat_message(data):
-    lobby_id = normalize_lobby_code(data.get("lobby_id")) or "DEFAULT"
+    lobby_id = resolve_lobby_id(data, request.sid)
     raw_message = data.get("message", "")
     message_text = str(raw_message).strip()
 
@@ -949,65 +2222,126 @@ def handle_send_chat_message(data):
         message_text = message_text[:CHAT_MESSAGE_MAX_LENGTH]
 
     should_emit_typing = False
-    with lobbies_lock:
-        lobby = lobbies.get(lobby_id)
+    with locked_lobby(lobby_id) as lobby:
         if not lobby:
             emit("error", {"message": "Lobby not found."})
             return
-        player = lobby["players"].get(request.sid)
+        player = lobby.players.get(request.sid)
         if not player:
             emit("error", {"message": "Join the lobby before sending messages."})
             return
 
         entry = append_chat_message(
+            lobby_id,
             lobby,
             request.sid,
-            player["name"],
+            player.name,
             message_text,
-            player.get("is_bot", False),
+            player.is_bot,
         )
-        tracker = ensure_typing_tracker(lobby)
+        tracker = lobby.typing_players
         if tracker.pop(request.sid, None) is not None:
             should_emit_typing = True
 
-    payload = dict(entry)
-    payload["lobby_id"] = lobby_id
-    socketio.emit("chat_message", payload, room=lobby_id)
+    socketio.emit("chat_message", entry, room=lobby_id)
     if should_emit_typing:
-        emit_typing_state(lobby_id)
+        request_broadcast(lobby_id, "typing_state")
 
 
-@socketio.on("chat_typing")
+@lobby_event("chat_typing")
 def handle_chat_typing(data):
-    lobby_id = normalize_lobby_code(data.get("lobby_id")) or "DEFAULT"
+    lobby_id = resolve_lobby_id(data, request.sid)
     is_typing = bool(data.get("typing"))
-    with lobbies_lock:
-        lobby = lobbies.get(lobby_id)
+    with locked_lobby(lobby_id) as lobby:
         if not lobby:
             return
-        player = lobby["players"].get(request.sid)
-        if not player or player.get("is_bot") or player["eliminated"]:
+        player = lobby.players.get(request.sid)
+        if not player or player.is_bot or player.eliminated:
             return
-        tracker = ensure_typing_tracker(lobby)
+        tracker = lobby.typing_players
         if is_typing:
             tracker[request.sid] = time.time()
         else:
             tracker.pop(request.sid, None)
-    emit_typing_state(lobby_id)
+    request_broadcast(lobby_id, "typing_state")
 
 
-@socketio.on("player_ready")
+@lobby_event("request_chat_history")
+def handle_request_chat_history(data):
+    """Replay the chat messages after ``since``, e.g. after a reconnect."""
+    data = data or {}
+    lobby_id = resolve_lobby_id(data, request.sid)
+    with locked_lobby(lobby_id) as lobby:
+        if not lobby or request.sid not in lobby.players:
+            return
+    emit_chat_history(lobby_id, request.sid, parse_chat_since(data.get("since")))
+
+
+@lobby_event("player_ready")
 def handle_player_ready(data):
-    lobby_id = normalize_lobby_code(data.get("lobby_id")) or "DEFAULT"
-    with lobbies_lock:
-        lobby = lobbies.get(lobby_id)
+    lobby_id = resolve_lobby_id(data, request.sid)
+    with locked_lobby(lobby_id) as lobby:
         if not lobby:
             return
-        player = lobby["players"].get(request.sid)
-        if not player or player.get("is_bot") or player["eliminated"]:
+        player = lobby.players.get(request.sid)
+        if not player or player.is_bot or player.eliminated:
             return
-        player["ready"] = True
-    broadcast_lobby_update(lobby_id)
+        set_player_ready(lobby, player, True)
+    request_broadcast(lobby_id, "lobby_update")
+
+
+@lobby_event("request_lobby_sync")
+def handle_request_lobby_sync(data):
+    lobby_id = resolve_lobby_id(data or {}, request.sid)
+    with locked_lobby(lobby_id) as lobby:
+        player = lobby.players.get(request.sid) if lobby else None
+        if not player:
+            return
+        payload = lobby_snapshot(lobby_id, lobby)
+    emit("lobby_update", encode_for(player.binary, "lobby_update", payload))
+
+
+@lobby_event("watch_lobby")
+def handle_watch_lobby(data):
+    """Follow a lobby without a seat: throttled snapshots, no chat, no guesses."""
+    lobby_id = resolve_lobby_id(data, request.sid)
+    wire_encoding = encoding.negotiate(data.get("encoding"))
+    binary = wire_encoding == encoding.MSGPACK
+    start_feed = False
+    with locked_lobby(lobby_id) as lobby:
+        if not lobby:
+            emit(
+                "error",
+                {"message": "Lobby code not found. Double-check the code and try again."},
+            )
+            return
+        if request.sid in lobby.players:
+            emit("error", {"message": "You are already playing in this lobby."})
+            return
+        remove_spectator(lobby_id, lobby, request.sid)
+        if MAX_SPECTATORS and len(lobby.spectators) >= MAX_SPECTATORS:
+            emit("error", {"message": "This lobby has reached its spectator limit."})
+            return
+        lobby.spectators[request.sid] = binary
+        if binary:
+            lobby.binary_spectators += 1
+        previous_lobby_id = register_session(lobby_id, lobby, request.sid, None)
+        if not lobby.spectator_feed:
+            lobby.spectator_feed = start_feed = True
+        payload = lobby_snapshot(lobby_id, lobby)
+        version = lobby.version
+
+    if previous_lobby_id and previous_lobby_id != lobby_id:
+        remove_session_player(previous_lobby_id, request.sid)
+
+    join_room(spectator_room(lobby_id, binary))
+    emit(
+        "watching_lobby",
+        {"lobby_id": lobby_id, "encoding": wire_encoding, "interval": SPECTATOR_INTERVAL},
+    )
+    emit("lobby_update", encode_for(binary, "lobby_update", payload))
+    if start_feed:
+        socketio.start_background_task(run_spectator_feed, lobby_id, version)
 
 
 @app.route("/")
@@ -1015,9 +2349,56 @@ def index():
     return app.send_static_file("index.html")
 
 
-@socketio.on("submit_number")
+@app.route("/stats")
+def stats():
+    return jsonify(lobby_stats())
+
+
+def count_lobby_members():
+    with lobbies_lock:
+        lobby_list = list(lobbies.values())
+    counts = {"human": 0, "bot": 0}
+    for lobby in lobby_list:
+        for player in list(lobby.players.values()):
+            counts["bot" if player.is_bot else "human"] += 1
+    return counts
+
+
+def count_spectators():
+    with lobbies_lock:
+        lobby_list = list(lobbies.values())
+    return sum(len(lobby.spectators) for lobby in lobby_list)
+
+
+metrics.CallbackMetric("balance_lobbies", "Lobbies in memory.", lambda: len(lobbies))
+metrics.CallbackMetric(
+    "balance_players", "Players in lobbies, by kind.", count_lobby_members, "kind"
+)
+metrics.CallbackMetric("balance_spectators", "Spectators watching lobbies.", count_spectators)
+metrics.CallbackMetric(
+    "balance_coalesced_broadcasts_total",
+    "Broadcast requests folded into a pending flush, by event.",
+    lambda: dict(coalesced_emits),
+    "event",
+    kind="counter",
+)
+metrics.CallbackMetric(
+    "balance_lobby_evictions_total",
+    "Lobbies closed by the lifecycle sweeper or the caps, by reason.",
+    lambda: dict(lobby_evictions),
+    "reason",
+    kind="counter",
+)
+
+
+@app.route("/metrics")
+def metrics_endpoint():
+    return Response(metrics.render(), mimetype="text/plain; version=0.0.4")
+
+
+@lobby_event("submit_number")
 def handle_submit_number(data):
-    lobby_id = normalize_lobby_code(data.get("lobby_id")) or "DEFAULT"
+    lobby_id = resolve_lobby_id(data, request.sid)
     try:
         number = float(data.get("number"))
     except (TypeError, ValueError):
@@ -1040,38 +2421,45 @@ def handle_submit_number(data):
     should_evaluate = False
     should_broadcast_choice = False
 
-    with lobbies_lock:
-        lobby = lobbies.get(lobby_id)
-        if not lobby or lobby["state"] != "running":
+    with locked_lobby(lobby_id) as lobby:
+        if not lobby or lobby.state != "running":
             emit("error", {"message": "Lobby not running."})
             return
 
-        player = lobby["players"].get(request.sid)
-        if not player or player["eliminated"]:
+        player = lobby.players.get(request.sid)
+        if not player or player.eliminated:
             emit("error", {"message": "Player not eligible to play."})
             return
 
-        if not lobby["awaiting_choices"]:
+        if not lobby.awaiting_choices:
             emit("error", {"message": "Round not accepting submissions."})
             return
 
-        player["choice"] = number
+        set_player_choice(lobby, player, number)
 
-        if all(
-            p["choice"] is not None
-            for p in lobby["players"].values()
-            if not p["eliminated"]
-        ):
+        if round_complete(lobby):
             should_evaluate = True
         else:
             should_broadcast_choice = True
 
     if should_broadcast_choice:
-        broadcast_lobby_update(lobby_id)
+        request_broadcast(lobby_id, "lobby_update")
     if should_evaluate:
         evaluate_round(lobby_id)
 
 
+if cluster.enabled:
+    socketio.start_background_task(cluster.listen, run_forwarded_event)
+
+if lobby_store:
+    restore_lobbies()
+
+if hasattr(signal, "SIGUSR2"):
+    signal.signal(signal.SIGUSR2, sampling_profiler.toggle)
+if os.environ.get("PROFILE_ENABLED") == "1":
+    sampling_profiler.enable()
+
+
 if __name__ == "__main__":
     port = int(os.environ.get("PORT", 5000))
     socketio.run(app, host="0.0.0.0", port=port)
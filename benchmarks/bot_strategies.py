@@ -0,0 +1,79 @@
+"""Bot decision cost and strength per strategy.
+
+Times ``generate_bot_choice`` for every bot of a lobby where all bots play
+one strategy, at a few lobby sizes, then plays headless games (see
+``simulator.py``) with the seats dealt round-robin across all strategies and
+reports each strategy's share of the wins. A random guesser wins
+``1 / len(STRATEGIES)`` of the games if strategy makes no difference.
+
+Usage: python benchmarks/bot_strategies.py [GAMES] [SIZE ...]
+"""
+import os
+import sys
+import time
+from collections import Counter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app  # noqa: E402
+import bots  # noqa: E402
+from simulator import HeadlessGame  # noqa: E402
+
+DEFAULT_SIZES = (5, 50, 500)
+DECISION_ROUNDS = 20
+
+
+def decisions_per_second(strategy, player_count):
+    game = HeadlessGame(player_count, lobby_id="BENCH")
+    lobby = game.lobby
+    for player in lobby.players.values():
+        player.strategy = strategy
+    # Past the duplicates and 0/100 thresholds, with a few rounds to learn from.
+    lobby.eliminations = 3
+    for average in (40.0, 30.0, 22.0):
+        bots.record_round(lobby, average, 0)
+    bot_ids = list(lobby.players)
+    started = time.perf_counter()
+    for _ in range(DECISION_ROUNDS):
+        lobby.round += 1
+        for bot_id in bot_ids:
+            app.generate_bot_choice(lobby, bot_id)
+    return DECISION_ROUNDS * len(bot_ids) / (time.perf_counter() - started)
+
+
+def tournament(games, player_count):
+    names = list(bots.STRATEGIES)
+    wins = Counter()
+    for _ in range(games):
+        game = HeadlessGame(player_count, lobby_id="BENCH")
+        for seat, player in enumerate(game.lobby.players.values()):
+            player.strategy = names[seat % len(names)]
+        game.play()
+        winner = app.check_winner(game.lobby)
+        if winner:
+            wins[winner.strategy] += 1
+    return wins
+
+
+def main(argv):
+    games = int(argv[0]) if argv else 200
+    sizes = [int(value) for value in argv[1:]] or list(DEFAULT_SIZES)
+    names = list(bots.STRATEGIES)
+
+    print("decisions/s")
+    print(f"{'players':>8} " + " ".join(f"{name:>10}" for name in names))
+    for size in sizes:
+        rates = [decisions_per_second(name, size) for name in names]
+        print(f"{size:>8} " + " ".join(f"{rate:>10.0f}" for rate in rates))
+
+    print(f"\nwin share over {games} games, seats dealt round-robin")
+    print(f"{'players':>8} " + " ".join(f"{name:>10}" for name in names))
+    for size in sizes:
+        played = max(1, games // max(1, size // 10))
+        wins = tournament(played, size)
+        total = sum(wins.values()) or 1
+        print(f"{size:>8} " + " ".join(f"{wins[name] / total:>10.0%}" for name in names))
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
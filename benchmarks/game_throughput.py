@@ -0,0 +1,56 @@
+"""Game hot-path throughput on the headless engine.
+
+Plays complete bot games for a fixed time per lobby size and reports
+games/sec, rounds/sec and the p50/p99 latency of ``score_round`` (the
+locked part of ``evaluate_round``).
+
+Usage: python benchmarks/game_throughput.py [SECONDS_PER_SIZE] [SIZE ...]
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from simulator import HeadlessGame  # noqa: E402
+
+
+DEFAULT_SIZES = (5, 50, 500)
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def run(player_count, duration):
+    games = 0
+    rounds = 0
+    evaluation_times = []
+    started = time.perf_counter()
+    while time.perf_counter() - started < duration:
+        game = HeadlessGame(player_count)
+        game.play()
+        games += 1
+        rounds += game.lobby.round
+        evaluation_times.extend(game.evaluation_times)
+    elapsed = time.perf_counter() - started
+    return games / elapsed, rounds / elapsed, evaluation_times
+
+
+def main(argv):
+    duration = float(argv[0]) if argv else 3.0
+    sizes = [int(value) for value in argv[1:]] or list(DEFAULT_SIZES)
+    print(f"{'players':>8} {'games/s':>9} {'rounds/s':>9} {'eval p50 us':>12} {'eval p99 us':>12}")
+    for size in sizes:
+        games_per_second, rounds_per_second, evaluation_times = run(size, duration)
+        print(
+            f"{size:>8} {games_per_second:>9.1f} {rounds_per_second:>9.1f} "
+            f"{percentile(evaluation_times, 0.5) * 1e6:>12.1f} "
+            f"{percentile(evaluation_times, 0.99) * 1e6:>12.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
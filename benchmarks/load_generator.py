@@ -0,0 +1,283 @@
+"""Socket.IO load generator: how many lobbies one server process can carry.
+
+Starts the app in its own process on localhost (or targets ``--url``) and
+drives it with real Socket.IO clients over websockets, using the same events
+as the browser: ``create_lobby``, ``join_lobby``, ``player_ready``,
+``host_start_round``, ``submit_number``, ``chat_typing`` and
+``send_chat_message``. Every lobby is ``MIN_PLAYERS`` human clients playing a
+few rounds with think time between actions.
+
+The lobby count is ramped step by step. For every step it prints histograms of
+
+* submit -> ``round_result``: from the submission that completes a round to
+  the result arriving at the host, and
+* action -> ``lobby_update``: from ``player_ready`` or ``submit_number`` to the
+  first update that shows it on the sending client,
+
+plus the server's CPU use. The saturation point is the last step whose
+``round_result`` p99 stays under ``--slo-ms`` without failed lobbies. The
+clients run in this process, so check that the server, not the generator, is
+the one at 100% CPU before trusting the number.
+
+Usage: python benchmarks/load_generator.py [--steps 5 10 20 ...] [--url URL]
+"""
+import eventlet
+eventlet.monkey_patch()
+
+import argparse  # noqa: E402
+import bisect  # noqa: E402
+import os  # noqa: E402
+import random  # noqa: E402
+import socket  # noqa: E402
+import subprocess  # noqa: E402
+import sys  # noqa: E402
+import time  # noqa: E402
+
+import socketio  # noqa: E402
+from eventlet.queue import Empty, Queue  # noqa: E402
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from app import MIN_PLAYERS  # noqa: E402
+
+
+DEFAULT_STEPS = (5, 10, 20, 40, 80, 160)
+THINK_TIME = (0.2, 0.8)
+CHAT_PROBABILITY = 0.3
+EVENT_TIMEOUT = 30
+# Upper bounds of the histogram buckets, in milliseconds.
+BUCKETS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, float("inf"))
+
+
+class Histogram:
+    def __init__(self):
+        self.counts = [0] * len(BUCKETS_MS)
+        self.samples = []
+
+    def add(self, seconds):
+        milliseconds = seconds * 1000
+        self.counts[bisect.bisect_left(BUCKETS_MS, milliseconds)] += 1
+        self.samples.append(milliseconds)
+
+    def percentile(self, fraction):
+        if not self.samples:
+            return float("nan")
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+    def render(self, title):
+        lines = [
+            f"  {title}: n={len(self.samples)} p50={self.percentile(0.5):.1f}ms "
+            f"p99={self.percentile(0.99):.1f}ms"
+        ]
+        peak = max(self.counts) or 1
+        lower = 0
+        for bound, count in zip(BUCKETS_MS, self.counts):
+            if count:
+                label = f"{lower:g}-{bound:g}ms" if bound != float("inf") else f">{lower:g}ms"
+                lines.append(f"    {label:>14} {count:>7} {'#' * max(1, 40 * count // peak)}")
+            lower = bound
+        return "\n".join(lines)
+
+
+class LoadClient:
+    """One simulated browser tab."""
+
+    def __init__(self, url, name, stats):
+        self.name = name
+        self.stats = stats
+        self.events = Queue()
+        self.pending_action = None
+        self.sio = socketio.Client(reconnection=False)
+        self.sio.on("*", self.on_event)
+        self.sio.connect(url, transports=["websocket"])
+
+    def on_event(self, event, data=None):
+        if event == "lobby_update" and self.pending_action:
+            action, sent_at = self.pending_action
+            me = next((p for p in data["players"] if p["name"] == self.name), None)
+            if me and (me["ready"] if action == "ready" else me["choice_submitted"] or data["awaiting_next_round"]):
+                self.stats["lobby_update"].add(time.perf_counter() - sent_at)
+                self.pending_action = None
+            return
+        self.events.put((event, data))
+
+    def emit(self, event, data, action=None):
+        if action:
+            self.pending_action = (action, time.perf_counter())
+        self.sio.emit(event, data)
+
+    def wait_for(self, event_name, predicate=None):
+        deadline = time.perf_counter() + EVENT_TIMEOUT
+        while True:
+            try:
+                event, data = self.events.get(timeout=max(deadline - time.perf_counter(), 0))
+            except Empty:
+                raise RuntimeError(f"{self.name} timed out waiting for {event_name}")
+            if event == "error":
+                raise RuntimeError(f"{self.name} got error: {data.get('message')}")
+            if event == event_name and (predicate is None or predicate(data)):
+                return data
+
+    def close(self):
+        self.sio.disconnect()
+
+
+def think():
+    eventlet.sleep(random.uniform(*THINK_TIME))
+
+
+def play_lobby(url, index, rounds, stats):
+    clients = []
+    try:
+        host = LoadClient(url, f"L{index}P0", stats)
+        clients.append(host)
+        host.emit("create_lobby", {"player_name": host.name, "client_id": host.name})
+        lobby_id = host.wait_for("lobby_created")["lobby_id"]
+        for seat in range(1, MIN_PLAYERS):
+            client = LoadClient(url, f"L{index}P{seat}", stats)
+            clients.append(client)
+            client.emit(
+                "join_lobby",
+                {"lobby_id": lobby_id, "player_name": client.name, "client_id": client.name},
+            )
+            client.wait_for("joined_lobby")
+
+        for round_number in range(1, rounds + 1):
+            for client in clients:
+                think()
+                client.emit("player_ready", {"lobby_id": lobby_id}, action="ready")
+            think()
+            host.emit("host_start_round", {"lobby_id": lobby_id})
+            for client in clients:
+                client.wait_for("game_started", lambda data: data["round"] == round_number)
+
+            last_submit = None
+            for client in random.sample(clients, len(clients)):
+                think()
+                if random.random() < CHAT_PROBABILITY:
+                    client.emit("chat_typing", {"lobby_id": lobby_id, "typing": True})
+                    client.emit("send_chat_message", {"lobby_id": lobby_id, "message": "gg"})
+                last_submit = time.perf_counter()
+                client.emit(
+                    "submit_number",
+                    {"lobby_id": lobby_id, "number": random.randint(0, 100)},
+                    action="submit",
+                )
+            host.wait_for("round_result", lambda data: data["round"] == round_number)
+            stats["round_result"].add(time.perf_counter() - last_submit)
+        return True
+    except Exception as error:  # noqa: BLE001 - a failed lobby is a data point
+        stats["errors"].append(str(error))
+        return False
+    finally:
+        for client in clients:
+            try:
+                client.close()
+            except Exception:  # noqa: BLE001
+                pass
+
+
+def process_cpu_seconds(pid):
+    try:
+        with open(f"/proc/{pid}/stat") as handle:
+            fields = handle.read().rsplit(")", 1)[1].split()
+    except OSError:
+        return None
+    return (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+
+
+def run_step(url, lobby_count, rounds, server_pid):
+    stats = {"round_result": Histogram(), "lobby_update": Histogram(), "errors": []}
+    cpu_before = process_cpu_seconds(server_pid) if server_pid else None
+    started = time.perf_counter()
+    pool = eventlet.GreenPool(lobby_count)
+    results = list(
+        pool.imap(lambda index: play_lobby(url, index, rounds, stats), range(lobby_count))
+    )
+    elapsed = time.perf_counter() - started
+    cpu_after = process_cpu_seconds(server_pid) if server_pid else None
+    stats["failed"] = results.count(False)
+    stats["elapsed"] = elapsed
+    stats["server_cpu"] = (
+        (cpu_after - cpu_before) / elapsed if cpu_before is not None and cpu_after is not None else None
+    )
+    return stats
+
+
+def free_port():
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        return probe.getsockname()[1]
+
+
+def start_server():
+    port = free_port()
+    env = dict(os.environ, PORT=str(port))
+    server = subprocess.Popen(
+        [sys.executable, os.path.join(ROOT, "app.py")],
+        cwd=ROOT,
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    deadline = time.time() + 20
+    while time.time() < deadline:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=0.5).close()
+            return server, f"http://127.0.0.1:{port}"
+        except OSError:
+            time.sleep(0.1)
+    server.kill()
+    raise RuntimeError("Server did not start listening")
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", help="target a running server instead of starting one")
+    parser.add_argument("--steps", type=int, nargs="+", default=list(DEFAULT_STEPS))
+    parser.add_argument("--rounds", type=int, default=3, help="rounds per lobby")
+    parser.add_argument("--slo-ms", type=float, default=250.0, help="round_result p99 budget")
+    args = parser.parse_args(argv)
+
+    server = None
+    url = args.url
+    if not url:
+        server, url = start_server()
+    saturation = None
+    try:
+        for lobby_count in args.steps:
+            stats = run_step(url, lobby_count, args.rounds, server.pid if server else None)
+            cpu = f"{stats['server_cpu'] * 100:.0f}%" if stats["server_cpu"] is not None else "n/a"
+            print(
+                f"{lobby_count} lobbies ({lobby_count * MIN_PLAYERS} clients): "
+                f"{stats['elapsed']:.1f}s, {stats['failed']} failed, server CPU {cpu}"
+            )
+            print(stats["round_result"].render("submit -> round_result"))
+            print(stats["lobby_update"].render("action -> lobby_update"))
+            for error in stats["errors"][:3]:
+                print(f"  error: {error}")
+            healthy = (
+                not stats["failed"]
+                and stats["round_result"].percentile(0.99) <= args.slo_ms
+            )
+            if not healthy:
+                break
+            saturation = lobby_count
+    finally:
+        if server:
+            server.terminate()
+            server.wait()
+
+    if saturation is None:
+        print(f"Saturated below {args.steps[0]} lobbies (p99 budget {args.slo_ms:g}ms).")
+    elif saturation == args.steps[-1]:
+        print(f"No saturation up to {saturation} lobbies (p99 budget {args.slo_ms:g}ms).")
+    else:
+        print(f"Saturation point: about {saturation} lobbies (p99 budget {args.slo_ms:g}ms).")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,112 @@
+"""Submit-to-result latency while many lobbies play at the same time.
+
+Every lobby plays rounds in its own greenlet, with some think time between
+rounds and typing toggles mixed into the submissions, so lobbies compete for
+the server the same way real rooms do. Latency is measured from the last
+``submit_number`` of a round to the ``round_result`` arriving at the host.
+
+With per-lobby locks a busy lobby no longer holds up the others, so the
+p50/p99 should only start to climb once the process itself runs out of CPU
+(the in-process test clients are a large part of that cost).
+
+Usage: python benchmarks/lobby_contention.py [LOBBY_COUNT ...]
+"""
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import eventlet  # noqa: E402
+
+from app import MIN_PLAYERS, app, socketio  # noqa: E402
+
+
+ROUNDS_PER_LOBBY = 3
+THINK_TIME = (0.5, 1.5)
+DEFAULT_LOBBY_COUNTS = (10, 50, 200)
+
+
+def wait_for(client, event_name, timeout=60):
+    deadline = time.perf_counter() + timeout
+    while True:
+        for packet in client.get_received():
+            if packet["name"] == event_name:
+                return packet["args"][0] if packet["args"] else {}
+        if time.perf_counter() > deadline:
+            raise RuntimeError(f"Timed out waiting for {event_name}")
+        eventlet.sleep(0.001)
+
+
+def open_lobby(index):
+    host = socketio.test_client(app)
+    host.emit("create_lobby", {"player_name": "Host", "client_id": f"bench-{index}-0"})
+    lobby_id = wait_for(host, "lobby_created")["lobby_id"]
+    clients = [host]
+    for seat in range(1, MIN_PLAYERS):
+        client = socketio.test_client(app)
+        client.emit(
+            "join_lobby",
+            {"lobby_id": lobby_id, "player_name": f"P{seat}", "client_id": f"bench-{index}-{seat}"},
+        )
+        wait_for(client, "joined_lobby")
+        clients.append(client)
+    return lobby_id, clients
+
+
+def play_rounds(lobby_id, clients, latencies):
+    host = clients[0]
+    for round_index in range(ROUNDS_PER_LOBBY):
+        eventlet.sleep(random.uniform(*THINK_TIME))
+        for client in clients:
+            client.emit("player_ready", {"lobby_id": lobby_id})
+        eventlet.sleep(0)
+        host.get_received()
+        host.emit("host_start_round", {"lobby_id": lobby_id})
+        wait_for(host, "game_started")
+        for seat, client in enumerate(clients):
+            client.emit("chat_typing", {"lobby_id": lobby_id, "typing": seat % 2 == 0})
+            if seat == len(clients) - 1:
+                started = time.perf_counter()
+            client.emit("submit_number", {"lobby_id": lobby_id, "number": 10 * seat + round_index})
+            eventlet.sleep(0)
+        wait_for(host, "round_result")
+        latencies.append(time.perf_counter() - started)
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def run(lobby_count):
+    lobbies = [open_lobby(index) for index in range(lobby_count)]
+    latencies = []
+    pool = eventlet.GreenPool(lobby_count)
+    started = time.perf_counter()
+    for lobby_id, clients in lobbies:
+        pool.spawn(play_rounds, lobby_id, clients, latencies)
+    pool.waitall()
+    elapsed = time.perf_counter() - started
+    for _, clients in lobbies:
+        for client in clients:
+            client.disconnect()
+    return latencies, elapsed
+
+
+def main(argv):
+    counts = [int(value) for value in argv] or list(DEFAULT_LOBBY_COUNTS)
+    print(f"{'lobbies':>8} {'rounds':>7} {'p50 ms':>8} {'p99 ms':>8} {'wall s':>7}")
+    for count in counts:
+        latencies, elapsed = run(count)
+        print(
+            f"{count:>8} {len(latencies):>7} "
+            f"{percentile(latencies, 0.5) * 1000:>8.2f} "
+            f"{percentile(latencies, 0.99) * 1000:>8.2f} {elapsed:>7.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,101 @@
+"""Lobby log write cost and warm-restart time.
+
+Builds LOBBY_COUNT lobbies of five players with some chat, writes them to a
+lobby log the way the server does (state records, then per-message chat
+records), logs a few rounds of changes on top, and times ``LobbyStore.load``
+plus ``restore_lobby`` for all of them, which is what startup does.
+
+Usage: python benchmarks/lobby_restore.py [LOBBY_COUNT] [CHAT_PER_LOBBY]
+"""
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import persistence  # noqa: E402
+from models import Lobby, Player  # noqa: E402
+
+CHAT_HISTORY_LIMIT = 100
+PLAYERS_PER_LOBBY = 5
+
+
+def build_lobby(index, chat_count):
+    lobby = Lobby()
+    for number in range(PLAYERS_PER_LOBBY):
+        sid = f"{index:08d}-{number:012d}"
+        lobby.players[sid] = Player(sid, f"Player {number}", 10, client_id=f"client-{sid}")
+    lobby.host_id = next(iter(lobby.players))
+    chat = []
+    for seq in range(1, chat_count + 1):
+        chat.append(
+            {
+                "lobby_id": f"L{index}",
+                "id": seq,
+                "seq": seq,
+                "player_id": lobby.host_id,
+                "name": "Player 0",
+                "message": f"message {seq}",
+                "timestamp": 1700000000000 + seq,
+                "is_bot": False,
+            }
+        )
+    lobby.chat_seq = chat_count
+    return lobby, chat
+
+
+def main(argv):
+    lobby_count = int(argv[0]) if argv else 20_000
+    chat_count = int(argv[1]) if len(argv) > 1 else 10
+    lobbies = {f"L{index}": build_lobby(index, chat_count) for index in range(lobby_count)}
+
+    with tempfile.TemporaryDirectory() as directory:
+        store = persistence.LobbyStore(os.path.join(directory, "lobbies.log"))
+        started = time.perf_counter()
+        records = []
+        for lobby_id, (lobby, chat) in lobbies.items():
+            records.append(persistence.encode(("state", lobby_id, persistence.lobby_record(lobby))))
+            records.extend(persistence.encode(("chat", lobby_id, entry)) for entry in chat)
+        encoded = time.perf_counter() - started
+        store.append(records)
+        written = time.perf_counter() - started
+
+        # Three rounds of score changes, one state record per lobby per round.
+        round_records = 0
+        round_started = time.perf_counter()
+        for _ in range(3):
+            batch = []
+            for lobby_id, (lobby, _chat) in lobbies.items():
+                for player in lobby.players.values():
+                    player.score -= 1
+                lobby.round += 1
+                batch.append(
+                    persistence.encode(("state", lobby_id, persistence.lobby_record(lobby)))
+                )
+            store.append(batch)
+            round_records += len(batch)
+        round_time = time.perf_counter() - round_started
+        size = os.path.getsize(store.path)
+
+        started = time.perf_counter()
+        saved = persistence.LobbyStore(store.path).load(CHAT_HISTORY_LIMIT)
+        loaded = time.perf_counter() - started
+        restored = {
+            lobby_id: persistence.restore_lobby(record, chat, CHAT_HISTORY_LIMIT)
+            for lobby_id, (record, chat) in saved.items()
+        }
+        rebuilt = time.perf_counter() - started
+
+    sample = restored["L0"]
+    assert sample.round == 3 and len(sample.chat) == chat_count
+    assert all(player.score == 7 for player in sample.players.values())
+    print(f"{lobby_count} lobbies, {PLAYERS_PER_LOBBY} players and {chat_count} messages each")
+    print(f"  full write:    {written:6.2f} s ({encoded:.2f} s encoding)")
+    print(f"  change record: {round_time / round_records * 1e6:6.1f} us each")
+    print(f"  log size:      {size / 1024 / 1024:6.1f} MiB")
+    print(f"  restart:       {rebuilt:6.2f} s ({loaded:.2f} s reading the log)")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
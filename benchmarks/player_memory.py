@@ -0,0 +1,102 @@
+"""Bytes per connected player: dict-based state against the slotted records.
+
+Builds the same lobbies twice, once with the dict layout the server used to
+keep (``legacy_lobby``/``legacy_player`` below) and once with
+``models.Lobby``/``models.Player``, and reports the traced allocation per
+player, lobby share included. Player ids and names are allocated in both runs
+so the absolute numbers stay realistic.
+
+Usage: python benchmarks/player_memory.py [PLAYER_COUNT] [PLAYERS_PER_LOBBY]
+"""
+import gc
+import os
+import sys
+import tracemalloc
+from threading import Lock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models import Lobby, Player  # noqa: E402
+
+
+STARTING_SCORE = 10
+
+
+def legacy_lobby():
+    return {
+        "lock": Lock(),
+        "players": {},
+        "state": "waiting",
+        "round": 0,
+        "eliminations": 0,
+        "awaiting_choices": False,
+        "awaiting_next_round": False,
+        "host_id": None,
+        "bot_counter": 0,
+        "chat": [],
+        "typing_players": {},
+        "client_sids": {},
+        "version": 0,
+        "lobby_payload": {},
+        "pending_broadcasts": set(),
+        "flush_scheduled": False,
+    }
+
+
+def legacy_player(sid, name, client_id):
+    return {
+        "id": sid,
+        "name": name,
+        "score": STARTING_SCORE,
+        "choice": None,
+        "eliminated": False,
+        "client_id": client_id,
+        "ready": False,
+        "delta_updates": True,
+        # Added once the player has played a round.
+        "timed_out": False,
+        "penalty": 0,
+    }
+
+
+def slotted_player(sid, name, client_id):
+    return Player(sid, name, STARTING_SCORE, client_id=client_id, delta_updates=True)
+
+
+def build(player_count, per_lobby, make_lobby, make_player, players_of):
+    lobbies = []
+    for index in range(player_count):
+        if index % per_lobby == 0:
+            lobbies.append(make_lobby())
+        sid = f"{index:020d}"
+        players_of(lobbies[-1])[sid] = make_player(sid, f"Player {index}", f"client-{index}")
+    return lobbies
+
+
+def measure(player_count, per_lobby, make_lobby, make_player, players_of):
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    lobbies = build(player_count, per_lobby, make_lobby, make_player, players_of)
+    used = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    del lobbies
+    return used / player_count
+
+
+def main(argv):
+    player_count = int(argv[0]) if argv else 100_000
+    per_lobby = int(argv[1]) if len(argv) > 1 else 5
+    legacy = measure(
+        player_count, per_lobby, legacy_lobby, legacy_player, lambda lobby: lobby["players"]
+    )
+    slotted = measure(
+        player_count, per_lobby, Lobby, slotted_player, lambda lobby: lobby.players
+    )
+    print(f"{player_count} players, {per_lobby} per lobby")
+    print(f"  dicts:   {legacy:7.0f} bytes/player")
+    print(f"  records: {slotted:7.0f} bytes/player ({(1 - slotted / legacy) * 100:.0f}% less)")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,198 @@
+"""Differential check of rules.resolve_round against the original apply_rules.
+
+``legacy_apply_rules`` is the per-player implementation the rules engine
+replaced, kept verbatim as the reference. Random rounds are biased towards
+the interesting cases (duplicates, exact hits, the 0/100 combo) and every
+result must match exactly. With NumPy installed the batch path
+``rules.resolve_rounds`` is checked against the same rounds.
+
+Usage: python benchmarks/rules_differential.py [ROUNDS] [SEED]
+"""
+import math
+import os
+import random
+import sys
+import time
+from collections import defaultdict
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import rules  # noqa: E402
+
+
+def legacy_apply_rules(lobby, target):
+    active_players = {
+        player_id: player
+        for player_id, player in lobby["players"].items()
+        if not player["eliminated"]
+    }
+    elimination_count = lobby["eliminations"]
+    disqualified = set()
+    extra_penalties = defaultdict(int)
+    rule_messages = []
+
+    if elimination_count >= 1:
+        number_groups = defaultdict(list)
+        for player_id, player in active_players.items():
+            number_groups[player["choice"]].append(player_id)
+
+        duplicates = {
+            number: ids for number, ids in number_groups.items() if len(ids) > 1
+        }
+        if duplicates:
+            for ids in duplicates.values():
+                for player_id in ids:
+                    disqualified.add(player_id)
+                    extra_penalties[player_id] += 1
+            rule_messages.append("Duplicate choices were disqualified (-1 penalty).")
+
+    winners = set()
+
+    zero_choosers = [
+        player_id
+        for player_id, player in active_players.items()
+        if player["choice"] == 0 and player_id not in disqualified
+    ]
+    hundred_choosers = [
+        player_id
+        for player_id, player in active_players.items()
+        if player["choice"] == 100 and player_id not in disqualified
+    ]
+    if elimination_count >= 3 and zero_choosers and hundred_choosers:
+        winners.update(hundred_choosers)
+        rule_messages.append(
+            "0/100 combo activated: player(s) with 100 win the round."
+        )
+
+    if not winners:
+        closest_distance = None
+        for player_id, player in active_players.items():
+            if player_id in disqualified:
+                continue
+            distance = abs(player["choice"] - target)
+            if closest_distance is None or distance < closest_distance - 1e-9:
+                winners = {player_id}
+                closest_distance = distance
+            elif math.isclose(distance, closest_distance, rel_tol=1e-9, abs_tol=1e-6):
+                winners.add(player_id)
+
+    exact_target_hitters = []
+    base_loss = 1
+    if elimination_count >= 2:
+        for player_id, player in active_players.items():
+            if player_id in disqualified:
+                continue
+            if math.isclose(player["choice"], target, rel_tol=1e-9, abs_tol=1e-6):
+                exact_target_hitters.append(player_id)
+        if exact_target_hitters:
+            base_loss = 2
+            rule_messages.append("Exact target hit: all other players lose 2 points.")
+
+    return {
+        "target": target,
+        "winners": winners,
+        "disqualified": disqualified,
+        "extra_penalties": extra_penalties,
+        "exact_target_hitters": exact_target_hitters,
+        "base_loss": base_loss,
+        "rule_messages": rule_messages,
+    }
+
+
+def random_round(rng, player_count):
+    style = rng.random()
+    if style < 0.25:
+        pool = [rng.randint(0, 100) for _ in range(rng.randint(1, 4))]
+        return [rng.choice(pool) for _ in range(player_count)]
+    if style < 0.4:
+        return [rng.choice((0, 100, rng.randint(0, 100))) for _ in range(player_count)]
+    if style < 0.55:
+        # Everyone on one value except one player, which makes exact hits likely.
+        value = rng.randint(0, 100)
+        choices = [value] * player_count
+        choices[rng.randrange(player_count)] = 0
+        return choices
+    return [rng.randint(0, 100) for _ in range(player_count)]
+
+
+def compare(choices, elimination_count):
+    lobby = {
+        "eliminations": elimination_count,
+        "players": {
+            index: {"choice": choice, "eliminated": False}
+            for index, choice in enumerate(choices)
+        },
+    }
+    target = rules.calculate_target(choices)
+    expected = legacy_apply_rules(lobby, target)
+    actual = rules.resolve_round(choices, elimination_count, target)
+    return (
+        actual["target"] == expected["target"]
+        and set(actual["winners"]) == expected["winners"]
+        and set(actual["disqualified"]) == expected["disqualified"]
+        and {index: rules.DUPLICATE_PENALTY for index in actual["disqualified"]}
+        == dict(expected["extra_penalties"])
+        and actual["exact_target_hitters"] == expected["exact_target_hitters"]
+        and actual["base_loss"] == expected["base_loss"]
+        and actual["rule_messages"] == expected["rule_messages"]
+    ), expected
+
+
+def check_batch(rng, rounds, player_count):
+    np = rules.np
+    choices = [random_round(rng, player_count) for _ in range(rounds)]
+    eliminations = [rng.randint(0, 4) for _ in range(rounds)]
+    batch = rules.resolve_rounds(choices, eliminations)
+    mismatches = 0
+    for row, (round_choices, elimination_count) in enumerate(zip(choices, eliminations)):
+        _, expected = compare(round_choices, elimination_count)
+        same = (
+            batch["targets"][row] == expected["target"]
+            and set(np.flatnonzero(batch["winners"][row]).tolist()) == expected["winners"]
+            and set(np.flatnonzero(batch["disqualified"][row]).tolist()) == expected["disqualified"]
+            and np.flatnonzero(batch["exact_target_hitters"][row]).tolist()
+            == expected["exact_target_hitters"]
+            and batch["base_loss"][row] == expected["base_loss"]
+        )
+        if not same:
+            mismatches += 1
+            if mismatches <= 5:
+                print(f"  batch mismatch: eliminations={elimination_count} choices={round_choices}")
+    return mismatches
+
+
+def main(argv):
+    rounds = int(argv[0]) if argv else 1_000_000
+    seed = int(argv[1]) if len(argv) > 1 else 1
+    rng = random.Random(seed)
+
+    started = time.perf_counter()
+    mismatches = 0
+    for _ in range(rounds):
+        player_count = rng.choice((2, 3, 5, 5, 5, 8, 12, 50))
+        choices = random_round(rng, player_count)
+        elimination_count = rng.randint(0, 4)
+        same, _ = compare(choices, elimination_count)
+        if not same:
+            mismatches += 1
+            if mismatches <= 5:
+                print(f"  mismatch: eliminations={elimination_count} choices={choices}")
+    elapsed = time.perf_counter() - started
+    print(f"resolve_round: {rounds} rounds, {mismatches} mismatches ({elapsed:.1f}s)")
+
+    if rules.np is None:
+        print("resolve_rounds: skipped (NumPy not installed)")
+    else:
+        batch_rounds = max(rounds // 10, 1)
+        batch_mismatches = sum(
+            check_batch(rng, batch_rounds // 4 or 1, player_count)
+            for player_count in (2, 5, 12, 50)
+        )
+        print(f"resolve_rounds: {batch_rounds} rounds, {batch_mismatches} mismatches")
+        mismatches += batch_mismatches
+
+    return 1 if mismatches else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,89 @@
+"""Encode CPU and bytes on the wire per event type: JSON against MessagePack.
+
+Payloads come from the server's own code on headless games (see
+``simulator.py``): ``round_result`` from ``score_round``, ``lobby_update``
+from ``lobby_snapshot``, ``lobby_delta`` from ``flush_lobby_changes``
+across a round, and a full ``chat_history``. Wire bytes are the Socket.IO
+packet as the server sends it, header and binary attachment included, without
+websocket framing. Needs the ``msgpack`` package.
+
+Usage: python benchmarks/wire_encoding.py [ITERATIONS] [SIZE ...]
+"""
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import msgpack  # noqa: E402
+from socketio import packet  # noqa: E402
+
+import app  # noqa: E402
+from simulator import HeadlessGame  # noqa: E402
+
+DEFAULT_SIZES = (5, 50, 500)
+
+
+def sample_payloads(player_count):
+    game = HeadlessGame(player_count, lobby_id="BENCH")
+    lobby = game.lobby
+    app.flush_lobby_changes(game.lobby_id, lobby)
+    round_result = game.play_round()
+    delta = app.flush_lobby_changes(game.lobby_id, lobby)
+    after = dict(app.lobby_snapshot(game.lobby_id, lobby))
+    for index in range(app.CHAT_HISTORY_LIMIT):
+        app.append_chat_message(
+            game.lobby_id, lobby, "player", "Player 1", f"message number {index}"
+        )
+    return {
+        "lobby_update": after,
+        "lobby_delta": delta,
+        "round_result": round_result,
+        "chat_history": {
+            "lobby_id": game.lobby_id,
+            "messages": list(lobby.chat),
+            "since": 0,
+            "latest_seq": lobby.chat_seq,
+        },
+    }
+
+
+def wire_bytes(event_name, argument):
+    encoded = packet.Packet(packet.EVENT, data=[event_name, argument]).encode()
+    if not isinstance(encoded, list):
+        encoded = [encoded]
+    return sum(len(part.encode("utf-8") if isinstance(part, str) else part) for part in encoded)
+
+
+def time_per_call(function, payload, iterations):
+    started = time.perf_counter()
+    for _ in range(iterations):
+        function(payload)
+    return (time.perf_counter() - started) / iterations
+
+
+def main(argv):
+    iterations = int(argv[0]) if argv else 2000
+    sizes = [int(value) for value in argv[1:]] or DEFAULT_SIZES
+    print(f"{'players':>7} {'event':<13} {'json us':>8} {'mp us':>8} "
+          f"{'json B':>8} {'mp B':>8} {'saved':>6}")
+    for player_count in sizes:
+        for event_name, payload in sample_payloads(player_count).items():
+            json_time = time_per_call(
+                lambda item: json.dumps([event_name, item], separators=(",", ":")),
+                payload,
+                iterations,
+            )
+            msgpack_time = time_per_call(msgpack.packb, payload, iterations)
+            json_size = wire_bytes(event_name, payload)
+            msgpack_size = wire_bytes(event_name, msgpack.packb(payload))
+            print(
+                f"{player_count:>7} {event_name:<13} {json_time * 1e6:8.1f} "
+                f"{msgpack_time * 1e6:8.1f} {json_size:8d} {msgpack_size:8d} "
+                f"{1 - msgpack_size / json_size:6.0%}"
+            )
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,160 @@
+"""Bot strategies for the 0.8x-average game.
+
+Each bot plays one named strategy, stored on its Player:
+
+* ``random`` - a uniform guess; the old bot, and level 0 below.
+* ``level_1`` to ``level_3`` - level-k reasoning: level 0 averages 50 and a
+  level-k bot best-responds to a table full of level k-1 players.
+* ``adaptive`` - best-responds to the lobby's next average as forecast from
+  the past round averages (Holt smoothing: level plus trend).
+
+A best response counts the bot's own pull on the average: with ``n`` active
+players and the others averaging ``a``, the guess ``x`` is on target when
+``x = 0.8 * ((n - 1) * a + x) / n``. Level-k guesses are memoized per
+(k, n), with ``n`` capped at BEST_RESPONSE_MAX_PLAYERS where one more player
+no longer moves the result, and the forecast is updated once per round by
+``record_round``, so a decision is a few lookups whatever the lobby size.
+
+Every strategy except ``random`` then plays to the rules in force (see
+``rules``):
+
+* once duplicates are disqualified, it moves to the nearest value no other
+  bot took this round;
+* once the 0/100 combo is live, it takes 100 when another bot is on 0 or,
+  now and then, when recent rounds had someone at 0.
+"""
+import functools
+import random
+
+from rules import COMBO_FROM, DUPLICATES_FROM, TARGET_FACTOR
+
+DEFAULT_STRATEGY = "random"
+LEVEL_ZERO_AVERAGE = 50.0
+BEST_RESPONSE_MAX_PLAYERS = 200
+# Holt smoothing of round averages, and of how often the lowest guess was 0.
+FORECAST_LEVEL_WEIGHT = 0.5
+FORECAST_TREND_WEIGHT = 0.3
+ZERO_RATE_WEIGHT = 0.3
+# Standard deviation of the noise on strategic guesses, so bots of one kind
+# do not all land on the same number.
+GUESS_SPREAD = 1.5
+# Chance of going for the 0/100 combo, times the recent rate of 0 guesses.
+COMBO_GAMBLE = 0.5
+
+
+class LobbyMemory:
+    """What a lobby's bots know: the smoothed past averages and this round's picks."""
+
+    __slots__ = ("level", "trend", "zero_rate", "round", "picks")
+
+    def __init__(self):
+        self.level = None
+        self.trend = 0.0
+        self.zero_rate = 0.0
+        self.round = None
+        # Values the lobby's bots chose in ``round``.
+        self.picks = set()
+
+    def forecast(self):
+        if self.level is None:
+            return None
+        return min(max(self.level + self.trend, 0.0), 100.0)
+
+
+def memory(lobby):
+    if lobby.bot_memory is None:
+        lobby.bot_memory = LobbyMemory()
+    return lobby.bot_memory
+
+
+def record_round(lobby, average, lowest):
+    """Learn from a finished round's average and lowest guess."""
+    state = memory(lobby)
+    if state.level is None:
+        state.level = average
+    else:
+        level = FORECAST_LEVEL_WEIGHT * average + (1 - FORECAST_LEVEL_WEIGHT) * (
+            state.level + state.trend
+        )
+        state.trend = FORECAST_TREND_WEIGHT * (level - state.level) + (
+            1 - FORECAST_TREND_WEIGHT
+        ) * state.trend
+        state.level = level
+    state.zero_rate += ZERO_RATE_WEIGHT * ((lowest == 0) - state.zero_rate)
+
+
+def best_response(player_count, others_average):
+    """The on-target guess against others averaging ``others_average``."""
+    n = min(player_count, BEST_RESPONSE_MAX_PLAYERS)
+    if n <= 1:
+        return others_average * TARGET_FACTOR
+    return TARGET_FACTOR * (n - 1) * others_average / (n - TARGET_FACTOR)
+
+
+@functools.lru_cache(maxsize=None)
+def level_k_guess(level, player_count):
+    if level == 0:
+        return LEVEL_ZERO_AVERAGE
+    return best_response(player_count, level_k_guess(level - 1, player_count))
+
+
+def play_random(lobby, rng):
+    return rng.randint(0, 100)
+
+
+def play_level_k(level, lobby, rng):
+    return level_k_guess(level, min(lobby.active_count, BEST_RESPONSE_MAX_PLAYERS))
+
+
+def play_adaptive(lobby, rng):
+    forecast = memory(lobby).forecast()
+    if forecast is None:
+        return play_level_k(2, lobby, rng)
+    return best_response(lobby.active_count, forecast)
+
+
+STRATEGIES = {
+    "random": play_random,
+    "level_1": functools.partial(play_level_k, 1),
+    "level_2": functools.partial(play_level_k, 2),
+    "level_3": functools.partial(play_level_k, 3),
+    "adaptive": play_adaptive,
+}
+
+
+def pick_strategy(weights, rng=random):
+    """A strategy name drawn from ``weights`` (name -> relative weight)."""
+    names = [name for name in weights if name in STRATEGIES and weights[name] > 0]
+    if not names:
+        return DEFAULT_STRATEGY
+    return rng.choices(names, [weights[name] for name in names])[0]
+
+
+def choose(lobby, player, rng=random):
+    """The whole number ``player`` guesses this round. The caller holds the lobby lock."""
+    state = memory(lobby)
+    if state.round != lobby.round:
+        state.round = lobby.round
+        state.picks = set()
+    strategy = STRATEGIES.get(player.strategy) or STRATEGIES[DEFAULT_STRATEGY]
+    if strategy is play_random:
+        choice = play_random(lobby, rng)
+    else:
+        choice = play_to_rules(lobby, state, strategy(lobby, rng), rng)
+    state.picks.add(choice)
+    return choice
+
+
+def play_to_rules(lobby, state, guess, rng):
+    picks = state.picks
+    if lobby.eliminations >= COMBO_FROM and 100 not in picks:
+        if 0 in picks or rng.random() < state.zero_rate * COMBO_GAMBLE:
+            return 100
+    choice = min(max(round(guess + rng.gauss(0, GUESS_SPREAD)), 0), 100)
+    if lobby.eliminations < DUPLICATES_FROM or choice not in picks or len(picks) > 100:
+        return choice
+    for distance in range(1, 101):
+        for candidate in (choice - distance, choice + distance):
+            if 0 <= candidate <= 100 and candidate not in picks:
+                return candidate
+    return choice
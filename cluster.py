@@ -0,0 +1,311 @@
+"""Shared state and cross-process messaging for running several game workers.
+
+Lobbies are sharded by lobby code: every lobby is owned by exactly one worker,
+which keeps its state in its own ``lobbies`` dict. A worker that receives an
+event for a lobby it does not own forwards it to the owner. Socket.IO emits
+fan out to every worker through a pub/sub client manager, so the owner can
+reach sockets that are connected elsewhere.
+
+Backends are picked with a URL:
+
+* ``memory://`` - single process, nothing shared (the default).
+* ``unix:///path/to/broker.sock`` - a small broker process on this machine,
+  started with ``python cluster.py serve /path/to/broker.sock``. Useful for
+  running several workers locally without Redis.
+* ``redis://host:port/db`` - Redis for state and pub/sub (needs ``redis``).
+
+Each worker is a separate server process (``CLUSTER_WORKER_INDEX`` 0..N-1 of
+``CLUSTER_WORKERS``) behind a load balancer with sticky sessions, since
+Socket.IO cannot spread one connection over several processes.
+"""
+import base64
+import json
+import os
+import socket
+import sys
+import zlib
+from threading import Lock
+
+import eventlet
+from eventlet.queue import Queue
+from socketio import PubSubManager
+
+
+SOCKETIO_CHANNEL = "socketio"
+# Marks a base64 string that stands for bytes (a MessagePack payload) in the
+# JSON lines of the local broker.
+BYTES_KEY = "__bytes__"
+
+
+def shard_for(lobby_id, worker_count):
+    """Index of the worker that owns ``lobby_id``."""
+    if worker_count <= 1:
+        return 0
+    return zlib.crc32(lobby_id.encode("utf-8")) % worker_count
+
+
+def encode_bytes(value):
+    if isinstance(value, (bytes, bytearray)):
+        return {BYTES_KEY: base64.b64encode(value).decode("ascii")}
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def decode_bytes(obj):
+    if len(obj) == 1 and BYTES_KEY in obj:
+        return base64.b64decode(obj[BYTES_KEY])
+    return obj
+
+
+class MemoryStateBackend:
+    """In-process backend for a single worker."""
+
+    def __init__(self):
+        self.values = {}
+        self.channels = {}
+
+    def get(self, key):
+        return self.values.get(key)
+
+    def set(self, key, value):
+        self.values[key] = value
+
+    def set_if_absent(self, key, value):
+        if key in self.values:
+            return False
+        self.values[key] = value
+        return True
+
+    def delete(self, key):
+        self.values.pop(key, None)
+
+    def publish(self, channel, data):
+        queue = self.channels.get(channel)
+        if queue is not None:
+            queue.put(data)
+
+    def listen(self, channel):
+        queue = self.channels.setdefault(channel, Queue())
+        while True:
+            yield queue.get()
+
+
+class UnixSocketStateBackend:
+    """Client for the broker started by ``python cluster.py serve PATH``.
+
+    Writes and publishes are sent without waiting for a reply; reads share one
+    connection and are serialized by a lock.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.lock = Lock()
+        self.connection = None
+        self.reader = None
+
+    def _connect(self):
+        connection = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        connection.connect(self.path)
+        return connection, connection.makefile("r", encoding="utf-8")
+
+    def _send(self, message, reply=False):
+        line = (json.dumps(message, default=encode_bytes) + "\n").encode("utf-8")
+        with self.lock:
+            if self.connection is None:
+                self.connection, self.reader = self._connect()
+            try:
+                self.connection.sendall(line)
+                if reply:
+                    return json.loads(self.reader.readline())["value"]
+            except (OSError, ValueError):
+                self.connection.close()
+                self.connection = None
+                raise
+        return None
+
+    def get(self, key):
+        return self._send({"op": "get", "key": key}, reply=True)
+
+    def set(self, key, value):
+        self._send({"op": "set", "key": key, "value": value})
+
+    def set_if_absent(self, key, value):
+        return self._send({"op": "setnx", "key": key, "value": value}, reply=True)
+
+    def delete(self, key):
+        self._send({"op": "del", "key": key})
+
+    def publish(self, channel, data):
+        self._send({"op": "pub", "channel": channel, "data": data})
+
+    def listen(self, channel):
+        connection, reader = self._connect()
+        connection.sendall((json.dumps({"op": "sub", "channel": channel}) + "\n").encode("utf-8"))
+        for line in reader:
+            yield json.loads(line, object_hook=decode_bytes)
+
+
+class RedisStateBackend:
+    def __init__(self, url):
+        try:
+            import redis
+        except ImportError:
+            raise RuntimeError("Redis backend needs the redis package (pip install redis).")
+        self.redis = redis.Redis.from_url(url)
+
+    def get(self, key):
+        value = self.redis.get(key)
+        return json.loads(value) if value is not None else None
+
+    def set(self, key, value):
+        self.redis.set(key, json.dumps(value))
+
+    def set_if_absent(self, key, value):
+        return bool(self.redis.set(key, json.dumps(value), nx=True))
+
+    def delete(self, key):
+        self.redis.delete(key)
+
+    def publish(self, channel, data):
+        self.redis.publish(channel, json.dumps(data))
+
+    def listen(self, channel):
+        pubsub = self.redis.pubsub(ignore_subscribe_messages=True)
+        pubsub.subscribe(channel)
+        for message in pubsub.listen():
+            yield json.loads(message["data"])
+
+
+class StateBackendManager(PubSubManager):
+    """Socket.IO client manager that fans emits out over a state backend."""
+
+    name = "state-backend"
+
+    def __init__(self, backend, channel=SOCKETIO_CHANNEL, **kwargs):
+        super().__init__(channel=channel, **kwargs)
+        self.backend = backend
+
+    def _publish(self, data):
+        self.backend.publish(self.channel, data)
+
+    def _listen(self):
+        return self.backend.listen(self.channel)
+
+
+def create_backend(url):
+    if url.startswith("memory://"):
+        return MemoryStateBackend()
+    if url.startswith("unix://"):
+        return UnixSocketStateBackend(url[len("unix://"):])
+    if url.startswith("redis://") or url.startswith("rediss://"):
+        return RedisStateBackend(url)
+    raise ValueError(f"Unsupported cluster backend: {url}")
+
+
+class Cluster:
+    """This worker's view of the cluster: which lobbies it owns and how to
+    reach the others."""
+
+    def __init__(self, url="memory://", worker_count=1, worker_index=0):
+        if not 0 <= worker_index < max(worker_count, 1):
+            raise ValueError("CLUSTER_WORKER_INDEX must be below CLUSTER_WORKERS")
+        if worker_count > 1 and url.startswith("memory://"):
+            raise ValueError("Several workers need a shared backend, not memory://")
+        self.url = url
+        self.backend = create_backend(url)
+        self.worker_count = max(worker_count, 1)
+        self.worker_index = worker_index
+
+    @property
+    def enabled(self):
+        return self.worker_count > 1
+
+    def socketio_options(self):
+        """Keyword arguments that make ``SocketIO`` emit through this cluster."""
+        if not self.enabled:
+            return {}
+        if isinstance(self.backend, RedisStateBackend):
+            return {"message_queue": self.url}
+        return {"client_manager": StateBackendManager(self.backend)}
+
+    def owner_of(self, lobby_id):
+        return shard_for(lobby_id, self.worker_count)
+
+    def owns(self, lobby_id):
+        return self.owner_of(lobby_id) == self.worker_index
+
+    def forward(self, lobby_id, event, sid, data):
+        self.backend.publish(
+            f"worker:{self.owner_of(lobby_id)}",
+            {"event": event, "sid": sid, "lobby_id": lobby_id, "data": data},
+        )
+
+    def listen(self, dispatch):
+        """Run ``dispatch`` for every event forwarded to this worker."""
+        for message in self.backend.listen(f"worker:{self.worker_index}"):
+            dispatch(message)
+
+    def set_session(self, sid, lobby_id):
+        if self.enabled:
+            self.backend.set(f"session:{sid}", lobby_id)
+
+    def drop_session(self, sid):
+        if self.enabled:
+            self.backend.delete(f"session:{sid}")
+
+    def session_lobby(self, sid):
+        if not self.enabled:
+            return None
+        return self.backend.get(f"session:{sid}")
+
+
+def serve(path):
+    """Run the local stand-in broker: a key/value store plus pub/sub channels."""
+    values = {}
+    subscribers = {}
+
+    def handle(connection, address):
+        reader = connection.makefile("r", encoding="utf-8")
+        for line in reader:
+            message = json.loads(line)
+            op = message["op"]
+            if op == "sub":
+                subscribers.setdefault(message["channel"], set()).add(connection)
+                continue
+            if op == "pub":
+                payload = (json.dumps(message["data"]) + "\n").encode("utf-8")
+                for subscriber in list(subscribers.get(message["channel"], ())):
+                    try:
+                        subscriber.sendall(payload)
+                    except OSError:
+                        subscribers[message["channel"]].discard(subscriber)
+                continue
+            if op == "set":
+                values[message["key"]] = message["value"]
+                continue
+            if op == "del":
+                values.pop(message["key"], None)
+                continue
+            if op == "get":
+                reply = values.get(message["key"])
+            elif op == "setnx":
+                reply = message["key"] not in values
+                if reply:
+                    values[message["key"]] = message["value"]
+            else:
+                reply = None
+            connection.sendall((json.dumps({"value": reply}) + "\n").encode("utf-8"))
+        for members in subscribers.values():
+            members.discard(connection)
+        connection.close()
+
+    if os.path.exists(path):
+        os.unlink(path)
+    server = eventlet.listen(path, family=socket.AF_UNIX)
+    print(f"Cluster broker listening on {path}")
+    eventlet.serve(server, handle)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 3 or sys.argv[1] != "serve":
+        sys.exit("usage: python cluster.py serve /path/to/broker.sock")
+    serve(sys.argv[2])
@@ -0,0 +1,92 @@
+"""Lobby code allocation without random retries.
+
+Codes are the base-``len(alphabet)`` digits of a counter passed through a
+keyed permutation (a small Feistel network with cycle walking), so successive
+codes look random but never repeat within one pass over the code space. When
+the counter wraps, the next pass hands out codes again, skipping the ones
+still in use, so codes of closed lobbies are reclaimed. A pool of ready codes
+is kept filled so lobby creation only pops from it.
+"""
+import random
+from collections import deque
+from threading import Lock
+
+FEISTEL_ROUNDS = 4
+
+
+class CodeSpaceExhausted(Exception):
+    """Every code this allocator may hand out is in use."""
+
+
+class LobbyCodeAllocator:
+    """Hand out unused lobby codes in O(1).
+
+    ``accept(code)`` limits the codes this allocator may use (for example the
+    ones sharded to this worker) and ``is_free(code)`` tells whether a code is
+    currently taken. Both are re-checked when a code leaves the pool.
+    """
+
+    def __init__(self, alphabet, length, accept=None, is_free=None, pool_size=64, seed=None):
+        self.alphabet = alphabet
+        self.length = length
+        self.size = len(alphabet) ** length
+        self.accept = accept or (lambda code: True)
+        self.is_free = is_free or (lambda code: True)
+        self.pool_size = pool_size
+        self.lock = Lock()
+        self.pool = deque()
+        self.counter = 0
+        # The Feistel network permutes 2 * half_bits bits; indices outside
+        # the code space are walked through the permutation again.
+        self.half_bits = ((self.size - 1).bit_length() + 1) // 2
+        self.half_mask = (1 << self.half_bits) - 1
+        rng = random.Random(seed)
+        self.keys = [rng.getrandbits(32) for _ in range(FEISTEL_ROUNDS)]
+
+    def permute(self, index):
+        while True:
+            left, right = index >> self.half_bits, index & self.half_mask
+            for key in self.keys:
+                mixed = ((right ^ key) * 0x9E3779B1) & 0xFFFFFFFF
+                left, right = right, left ^ ((mixed ^ (mixed >> 15)) & self.half_mask)
+            index = (left << self.half_bits) | right
+            if index < self.size:
+                return index
+
+    def encode(self, index):
+        base = len(self.alphabet)
+        digits = []
+        for _ in range(self.length):
+            index, digit = divmod(index, base)
+            digits.append(self.alphabet[digit])
+        return "".join(digits)
+
+    def next_code(self):
+        """The next usable code from the counter. The caller holds ``lock``."""
+        for _ in range(self.size):
+            code = self.encode(self.permute(self.counter))
+            self.counter = (self.counter + 1) % self.size
+            if self.accept(code) and self.is_free(code) and code not in self.pool:
+                return code
+        raise CodeSpaceExhausted()
+
+    def refill(self):
+        """Top the pool up to ``pool_size`` codes."""
+        with self.lock:
+            while len(self.pool) < self.pool_size:
+                try:
+                    self.pool.append(self.next_code())
+                except CodeSpaceExhausted:
+                    return
+
+    def needs_refill(self):
+        return len(self.pool) < self.pool_size // 2
+
+    def allocate(self):
+        """Return an unused code. Raises CodeSpaceExhausted when none is left."""
+        with self.lock:
+            while self.pool:
+                code = self.pool.popleft()
+                if self.is_free(code):
+                    return code
+            return self.next_code()
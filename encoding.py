@@ -0,0 +1,124 @@
+"""JSON for Socket.IO packets that reuses already encoded payloads.
+
+``SocketIO(json=encoding)`` makes every packet go through ``dumps`` below.
+A payload wrapped in ``EncodedPayload`` is encoded on its first emit and the
+text is spliced into every later packet that carries it, so a payload sent to
+several rooms or replayed on request is serialized once. Anything else, and
+an ``EncodedPayload`` outside a packet (it is still a dict), is encoded by the
+standard library as usual. Every event packet is counted in ``metrics``.
+
+Clients that negotiate it get the bulky events as MessagePack instead: one
+binary argument that ``pack`` encodes (and caches, for an ``EncodedPayload``).
+It needs the optional ``msgpack`` package; without it every client gets JSON.
+"""
+import json
+
+import metrics
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+PACKET_SEPARATORS = (",", ":")
+MSGPACK = "msgpack"
+
+loads = json.loads
+
+
+class EncodedPayload(dict):
+    """A payload dict that caches its packet JSON. Do not mutate it once emitted."""
+
+    __slots__ = ("text", "packed")
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.text = None
+        self.packed = None
+
+    def encoded(self):
+        if self.text is None:
+            self.text = json.dumps(self, separators=PACKET_SEPARATORS)
+        return self.text
+
+    def msgpacked(self):
+        if self.packed is None:
+            self.packed = msgpack.packb(self)
+        return self.packed
+
+
+class SplicedPayload(EncodedPayload):
+    """An EncodedPayload whose ``key`` holds a list of EncodedPayloads.
+
+    Both encodings are spliced together from the items' cached ones, so a
+    list replayed in many payloads (chat history, say) encodes each item once.
+    """
+
+    __slots__ = ("key",)
+
+    def __init__(self, payload, key):
+        super().__init__(payload)
+        self.key = key
+
+    def encoded(self):
+        if self.text is None:
+            rest = {name: value for name, value in self.items() if name != self.key}
+            head = json.dumps(rest, separators=PACKET_SEPARATORS)[:-1]
+            items = ",".join(item.encoded() for item in self[self.key])
+            self.text = f"{head}{',' if rest else ''}{json.dumps(self.key)}:[{items}]}}"
+        return self.text
+
+    def msgpacked(self):
+        if self.packed is None:
+            packer = msgpack.Packer()
+            parts = [packer.pack_map_header(len(self))]
+            for name, value in self.items():
+                if name != self.key:
+                    parts.append(packer.pack(name))
+                    parts.append(packer.pack(value))
+            items = self[self.key]
+            parts.append(packer.pack(self.key))
+            parts.append(packer.pack_array_header(len(items)))
+            parts.extend(item.msgpacked() for item in items)
+            self.packed = b"".join(parts)
+        return self.packed
+
+
+def negotiate(requested):
+    """The encoding a client gets for its binary-capable events."""
+    return MSGPACK if requested == MSGPACK and msgpack is not None else "json"
+
+
+def pack(event_name, payload):
+    """Encode one event's payload as MessagePack bytes."""
+    if isinstance(payload, EncodedPayload):
+        data = payload.msgpacked()
+    else:
+        data = msgpack.packb(payload)
+    metrics.EMITS.inc(f"{event_name}:{MSGPACK}")
+    metrics.PAYLOAD_BYTES.observe(len(data), f"{event_name}:{MSGPACK}")
+    return data
+
+
+def dumps(obj, **kwargs):
+    # Socket.IO encodes an event as [event_name, *args].
+    if not (
+        isinstance(obj, list)
+        and obj
+        and isinstance(obj[0], str)
+        and kwargs.get("separators") == PACKET_SEPARATORS
+    ):
+        return json.dumps(obj, **kwargs)
+    if any(isinstance(item, EncodedPayload) for item in obj):
+        text = "[" + ",".join(
+            item.encoded() if isinstance(item, EncodedPayload) else json.dumps(item, **kwargs)
+            for item in obj
+        ) + "]"
+    else:
+        text = json.dumps(obj, **kwargs)
+        if len(obj) == 2 and isinstance(obj[1], dict) and obj[1].get("_placeholder"):
+            # The header of a binary event; pack() counted the payload.
+            return text
+    metrics.EMITS.inc(obj[0])
+    metrics.PAYLOAD_BYTES.observe(len(text), obj[0])
+    return text
@@ -0,0 +1,191 @@
+"""Process metrics in the Prometheus text format, without extra dependencies.
+
+Counters and histograms are plain dicts updated in place; under eventlet no
+other greenlet runs in the middle of an update, so they need no locks and an
+observation costs a bisect and a few additions. Values that are cheaper to
+read than to track (lobby counts, say) are gauges computed at scrape time.
+"""
+import bisect
+import time
+
+# Upper bounds in seconds, for handler, lock and evaluation timings.
+LATENCY_BUCKETS = (
+    0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0
+)
+# Upper bounds in bytes, for encoded packets.
+SIZE_BUCKETS = (64, 256, 1024, 4096, 16384, 65536, 262144)
+
+registry = []
+
+
+def format_labels(label_name, label):
+    if label_name is None:
+        return ""
+    value = str(label).replace("\\", "\\\\").replace('"', '\\"')
+    return f'{label_name}="{value}"'
+
+
+def wrap(labels):
+    return "{" + labels + "}" if labels else ""
+
+
+class Counter:
+    def __init__(self, name, documentation, label_name=None):
+        self.name = name
+        self.documentation = documentation
+        self.label_name = label_name
+        self.values = {}
+        registry.append(self)
+
+    def inc(self, label=None, amount=1):
+        self.values[label] = self.values.get(label, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        for label, value in self.values.items():
+            lines.append(f"{self.name}{wrap(format_labels(self.label_name, label))} {value}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, documentation, label_name=None, buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.label_name = label_name
+        self.buckets = buckets
+        # label -> [per-bucket counts (last one is +Inf), sum]
+        self.values = {}
+        registry.append(self)
+
+    def observe(self, value, label=None):
+        entry = self.values.get(label)
+        if entry is None:
+            entry = self.values[label] = [[0] * (len(self.buckets) + 1), 0.0]
+        entry[0][bisect.bisect_left(self.buckets, value)] += 1
+        entry[1] += value
+
+    def time(self, label=None):
+        return Timer(self, label)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        for label, (counts, total) in self.values.items():
+            labels = format_labels(self.label_name, label)
+            prefix = labels + "," if labels else ""
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(f'{self.name}_bucket{{{prefix}le="{le}"}} {cumulative}')
+            lines.append(f"{self.name}_sum{wrap(labels)} {total}")
+            lines.append(f"{self.name}_count{wrap(labels)} {cumulative}")
+        return lines
+
+
+class Timer:
+    """Context manager that observes its duration in a histogram."""
+
+    __slots__ = ("histogram", "label", "started")
+
+    def __init__(self, histogram, label):
+        self.histogram = histogram
+        self.label = label
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.histogram.observe(time.perf_counter() - self.started, self.label)
+
+
+class CallbackMetric:
+    """Gauge or counter read at scrape time.
+
+    ``read()`` returns a number, or a dict of label value -> number.
+    """
+
+    def __init__(self, name, documentation, read, label_name=None, kind="gauge"):
+        self.name = name
+        self.documentation = documentation
+        self.read = read
+        self.label_name = label_name
+        self.kind = kind
+        registry.append(self)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        values = self.read()
+        if not isinstance(values, dict):
+            values = {None: values}
+        for label, value in values.items():
+            lines.append(f"{self.name}{wrap(format_labels(self.label_name, label))} {value}")
+        return lines
+
+
+class TimedLock:
+    """Wrap a lock so every ``with`` block records its wait and hold times."""
+
+    __slots__ = ("lock", "wait_histogram", "hold_histogram", "acquired_at")
+
+    def __init__(self, lock, wait_histogram, hold_histogram):
+        self.lock = lock
+        self.wait_histogram = wait_histogram
+        self.hold_histogram = hold_histogram
+        self.acquired_at = 0.0
+
+    def __enter__(self):
+        started = time.perf_counter()
+        self.lock.acquire()
+        self.acquired_at = time.perf_counter()
+        self.wait_histogram.observe(self.acquired_at - started)
+        return self
+
+    def __exit__(self, *exc_info):
+        held = time.perf_counter() - self.acquired_at
+        self.lock.release()
+        self.hold_histogram.observe(held)
+
+
+def render():
+    lines = []
+    for metric in registry:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+HANDLER_SECONDS = Histogram(
+    "balance_handler_duration_seconds", "Socket.IO handler run time.", "event"
+)
+LOBBIES_LOCK_WAIT_SECONDS = Histogram(
+    "balance_lobbies_lock_wait_seconds", "Time spent waiting for lobbies_lock."
+)
+LOBBIES_LOCK_HOLD_SECONDS = Histogram(
+    "balance_lobbies_lock_hold_seconds", "Time lobbies_lock was held per acquisition."
+)
+# One series for the locks of every lobby, where handlers actually contend.
+LOBBY_LOCK_WAIT_SECONDS = Histogram(
+    "balance_lobby_lock_wait_seconds", "Time spent waiting for a lobby's lock."
+)
+LOBBY_LOCK_HOLD_SECONDS = Histogram(
+    "balance_lobby_lock_hold_seconds", "Time a lobby's lock was held per acquisition."
+)
+EVALUATE_ROUND_SECONDS = Histogram(
+    "balance_evaluate_round_duration_seconds", "Run time of evaluate_round, emits included."
+)
+EMITS = Counter("balance_emits_total", "Socket.IO event packets encoded, by event.", "event")
+PAYLOAD_BYTES = Histogram(
+    "balance_payload_bytes", "Encoded size of event packets.", "event", buckets=SIZE_BUCKETS
+)
+RATE_LIMITED = Counter(
+    "balance_rate_limited_total", "Client events dropped by rate limiting.", "event"
+)
+SLOW_CONSUMER_SKIPS = Counter(
+    "balance_slow_consumer_skips_total",
+    "Non-critical packets not sent to clients with a backed-up outbound queue.",
+    "event",
+)
+STALLED_CONSUMER_DISCONNECTS = Counter(
+    "balance_stalled_consumer_disconnects_total",
+    "Clients disconnected because their outbound queue kept growing.",
+)
@@ -0,0 +1,180 @@
+"""In-memory records for lobbies and players.
+
+Plain classes with ``__slots__`` instead of dicts: a server holding many
+thousands of players keeps one small fixed-layout object per player rather
+than a hash table of string keys. What goes over the wire is still built as
+dicts by the serializers in ``app``.
+"""
+import time
+from threading import Lock
+
+import metrics
+
+
+class Player:
+    __slots__ = (
+        "id",
+        "name",
+        "score",
+        "choice",
+        "eliminated",
+        "is_bot",
+        "ready",
+        "client_id",
+        "delta_updates",
+        "timed_out",
+        "penalty",
+        "detached",
+        "binary",
+        "strategy",
+    )
+
+    def __init__(
+        self,
+        player_id,
+        name,
+        score,
+        is_bot=False,
+        ready=False,
+        client_id=None,
+        delta_updates=False,
+        binary=False,
+        strategy=None,
+    ):
+        self.id = player_id
+        self.name = name
+        self.score = score
+        self.choice = None
+        self.eliminated = False
+        self.is_bot = is_bot
+        self.ready = ready
+        self.client_id = client_id
+        self.delta_updates = delta_updates
+        # Takes the bulky events as MessagePack (see encoding.pack).
+        self.binary = binary
+        self.timed_out = False
+        self.penalty = 0
+        # Restored from the lobby log with no connection yet; the client that
+        # rejoins with the same client_id takes the player over.
+        self.detached = False
+        # Name of the bots.STRATEGIES entry a bot plays.
+        self.strategy = strategy
+
+
+class Lobby:
+    __slots__ = (
+        "lock",
+        "players",
+        "state",
+        "round",
+        "eliminations",
+        "awaiting_choices",
+        "awaiting_next_round",
+        "host_id",
+        "returning_host",
+        "bot_counter",
+        "chat",
+        "chat_seq",
+        "typing_players",
+        "client_sids",
+        "version",
+        "lobby_payload",
+        "sent_fields",
+        "sent_players",
+        "changed_players",
+        "removed_players",
+        "recent_deltas",
+        "pending_broadcasts",
+        "flush_scheduled",
+        "flush_window_end",
+        "capacity",
+        "human_names",
+        "bot_ids",
+        "unready_count",
+        "binary_players",
+        "full_update_players",
+        "active_count",
+        "submitted_count",
+        "choice_sum",
+        "spectators",
+        "binary_spectators",
+        "spectator_events",
+        "spectator_feed",
+        "bot_memory",
+        "last_active",
+        "closed",
+    )
+
+    def __init__(self, capacity=None):
+        self.lock = metrics.TimedLock(
+            Lock(), metrics.LOBBY_LOCK_WAIT_SECONDS, metrics.LOBBY_LOCK_HOLD_SECONDS
+        )
+        self.players = {}
+        self.state = "waiting"
+        self.round = 0
+        self.eliminations = 0
+        self.awaiting_choices = False
+        self.awaiting_next_round = False
+        self.host_id = None
+        # client_id of a host whose seat is detached; the role is lent to a
+        # connected player until that client resumes.
+        self.returning_host = None
+        self.bot_counter = 0
+        # Serialized chat_message payloads, oldest first, in a bounded deque
+        # created by the first message. ``seq`` counts up from 1, so the
+        # buffer always holds the last ``len(chat)`` sequence numbers.
+        self.chat = ()
+        self.chat_seq = 0
+        self.typing_players = {}
+        self.client_sids = {}
+        self.version = 0
+        # Full lobby_update payload for ``version``, built on demand by
+        # app.lobby_snapshot() and dropped when the version moves.
+        self.lobby_payload = None
+        # What clients hold at ``version``: the top-level fields and each
+        # player's serialized entry, in the order clients list them.
+        self.sent_fields = {}
+        self.sent_players = {}
+        # Player ids changed or removed since, recorded by app.add_player()
+        # and the other mutators (ordered sets), for the next lobby_delta.
+        self.changed_players = {}
+        self.removed_players = {}
+        # The last few lobby_delta payloads, for clients resuming a session;
+        # a bounded deque once the first delta is sent.
+        self.recent_deltas = ()
+        self.pending_broadcasts = set()
+        self.flush_scheduled = False
+        # Monotonic time before which app.request_broadcast() coalesces
+        # instead of sending at once.
+        self.flush_window_end = 0.0
+        # Most players the lobby seats; None for app.LOBBY_CAPACITY.
+        self.capacity = capacity
+        # Indexes over ``players`` kept by app.add_player() and friends, so
+        # joins and ready checks do not scan the lobby: normalized display
+        # name -> sid for humans, bot ids in join order, and the number of
+        # active humans not ready yet.
+        self.human_names = {}
+        self.bot_ids = {}
+        self.unready_count = 0
+        # Humans taking MessagePack, and legacy ones taking full lobby_update
+        # payloads, so broadcasts know which copies to build.
+        self.binary_players = 0
+        self.full_update_players = 0
+        # Running round counters, likewise: players not eliminated, how many
+        # of them have a choice in, and the sum of those choices.
+        self.active_count = 0
+        self.submitted_count = 0
+        self.choice_sum = 0
+        # Spectator sid -> whether it takes MessagePack, how many do, events
+        # waiting for the next app.run_spectator_feed() tick, and whether
+        # that feed is running.
+        self.spectators = {}
+        self.binary_spectators = 0
+        self.spectator_events = {}
+        self.spectator_feed = False
+        # bots.LobbyMemory, once a bot has played or a round was scored.
+        self.bot_memory = None
+        # Monotonic time of the last lookup, for idle expiry and LRU eviction.
+        self.last_active = time.monotonic()
+        self.closed = False
+
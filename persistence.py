@@ -0,0 +1,163 @@
+"""Append-only log of lobby state for restoring lobbies after a restart.
+
+The log is a sequence of records, each framed as ``<length><crc32><pickle>``:
+
+* ``("state", lobby_id, fields)`` - the lobby's game state and players, as
+  built by ``lobby_record``; it replaces any earlier state of that lobby.
+* ``("chat", lobby_id, message)`` - one chat message, appended to the lobby's
+  history.
+* ``("close", lobby_id)`` - the lobby is gone; earlier records are dropped.
+
+Records are only ever appended, in batches, so a crash loses at most the last
+unwritten batch. A torn record at the end (a crash mid-write) fails its
+checksum; ``load`` stops there and truncates the file back to the last good
+record. Once the log grows to ``COMPACT_RATIO`` times the size of the state it
+holds, ``rewrite`` replaces it with one state record per lobby plus its chat.
+
+``LobbyStore`` only does file I/O and is meant to be called from a real
+thread (``eventlet.tpool``) so fsync never blocks the hub.
+"""
+import os
+import pickle
+import struct
+import zlib
+from collections import deque
+
+from models import Lobby, Player
+
+HEADER = struct.Struct("<II")
+COMPACT_RATIO = 2
+COMPACT_MIN_BYTES = 1024 * 1024
+
+# Stored by position like player slots: new fields go at the end, and a
+# lobby from an older log keeps the Lobby default for the missing ones.
+LOBBY_FIELDS = (
+    "state",
+    "round",
+    "eliminations",
+    "awaiting_choices",
+    "awaiting_next_round",
+    "host_id",
+    "bot_counter",
+    "chat_seq",
+    "version",
+    "capacity",
+)
+
+
+def lobby_record(lobby):
+    """The persisted part of a lobby, as plain tuples. The caller holds its lock.
+
+    Player fields are stored in ``Player.__slots__`` order, so new slots go at
+    the end to keep older logs loadable.
+    """
+    return (
+        tuple(getattr(lobby, field) for field in LOBBY_FIELDS),
+        tuple(
+            tuple(getattr(player, field) for field in Player.__slots__)
+            for player in lobby.players.values()
+        ),
+    )
+
+
+def restore_lobby(record, chat, chat_limit):
+    """Build a Lobby from ``lobby_record`` output and its stored chat messages."""
+    lobby_values, player_values = record
+    lobby = Lobby()
+    for field, value in zip(LOBBY_FIELDS, lobby_values):
+        setattr(lobby, field, value)
+    for values in player_values:
+        player = Player(None, None, None)
+        for field, value in zip(Player.__slots__, values):
+            setattr(player, field, value)
+        lobby.players[player.id] = player
+    if chat:
+        lobby.chat = deque(chat, maxlen=chat_limit)
+    return lobby
+
+
+def encode(record):
+    data = pickle.dumps(record, protocol=pickle.HIGHEST_PROTOCOL)
+    return HEADER.pack(len(data), zlib.crc32(data)) + data
+
+
+class LobbyStore:
+    def __init__(self, path):
+        self.path = path
+        self.size = 0
+        self.compacted_size = 0
+
+    def load(self, chat_limit):
+        """Read the log and return ``{lobby_id: (record, chat messages)}``."""
+        states = {}
+        chats = {}
+        # Bytes of each lobby's latest state and of its chat, roughly what a
+        # rewrite would keep.
+        state_sizes = {}
+        chat_sizes = {}
+        try:
+            with open(self.path, "rb") as handle:
+                data = handle.read()
+        except FileNotFoundError:
+            data = b""
+        offset = 0
+        while offset + HEADER.size <= len(data):
+            length, checksum = HEADER.unpack_from(data, offset)
+            body = data[offset + HEADER.size:offset + HEADER.size + length]
+            if len(body) < length or zlib.crc32(body) != checksum:
+                break
+            try:
+                kind, lobby_id, *value = pickle.loads(body)
+            except Exception:
+                break
+            offset += HEADER.size + length
+            if kind == "state":
+                states[lobby_id] = value[0]
+                state_sizes[lobby_id] = HEADER.size + length
+            elif kind == "chat":
+                history = chats.get(lobby_id)
+                if history is None:
+                    history = chats[lobby_id] = deque(maxlen=chat_limit)
+                # A message logged while a rewrite was being taken is in both.
+                if not history or history[-1]["seq"] < value[0]["seq"]:
+                    history.append(value[0])
+                    chat_sizes[lobby_id] = chat_sizes.get(lobby_id, 0) + HEADER.size + length
+            elif kind == "close":
+                states.pop(lobby_id, None)
+                state_sizes.pop(lobby_id, None)
+                chats.pop(lobby_id, None)
+                chat_sizes.pop(lobby_id, None)
+        if offset < len(data):
+            with open(self.path, "r+b") as handle:
+                handle.truncate(offset)
+        self.size = offset
+        self.compacted_size = sum(state_sizes.values()) + sum(chat_sizes.values())
+        return {
+            lobby_id: (record, list(chats.get(lobby_id, ())))
+            for lobby_id, record in states.items()
+        }
+
+    def append(self, records):
+        """Append encoded records and fsync. Runs in a real thread."""
+        if not records:
+            return
+        data = b"".join(records)
+        with open(self.path, "ab") as handle:
+            handle.write(data)
+            handle.flush()
+            os.fsync(handle.fileno())
+        self.size += len(data)
+
+    def needs_compaction(self):
+        return self.size > max(COMPACT_MIN_BYTES, COMPACT_RATIO * self.compacted_size)
+
+    def rewrite(self, records):
+        """Replace the log with ``records`` (a full snapshot). Runs in a real thread."""
+        data = b"".join(records)
+        temporary = self.path + ".tmp"
+        with open(temporary, "wb") as handle:
+            handle.write(data)
+            handle.flush()
+            os.fsync(handle.fileno())
+        os.replace(temporary, self.path)
+        self.size = self.compacted_size = len(data)
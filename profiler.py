@@ -0,0 +1,138 @@
+"""Opt-in sampling profiler for Socket.IO handlers and background tasks.
+
+While enabled, a real OS thread (not a greenlet, so it keeps running while
+the hub is busy) samples the main thread's stack every ``interval`` seconds.
+Samples where the hub is idle are dropped; the rest are counted per stack and
+written in the collapsed format read by flamegraph.pl and speedscope:
+``frame;frame;frame count``, root first.
+
+Functions wrapped with ``profiled(label)`` also get a per-call record for a
+``sample_rate`` share of their calls: wall time and thread CPU time. Under
+eventlet the CPU time of a call that waits includes whatever other greenlets
+ran meanwhile.
+
+The profiler is toggled at runtime with ``enable()``/``disable()`` (the app
+wires them to SIGUSR2). Disabling writes ``output`` and ``output + ".calls"``.
+"""
+import functools
+import os
+import random
+import sys
+import time
+from collections import Counter
+
+from eventlet import patcher
+
+real_thread = patcher.original("_thread")
+real_time = patcher.original("time")
+
+IDLE_MARKER = os.path.join("eventlet", "hubs")
+
+
+def frame_label(code):
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class SamplingProfiler:
+    def __init__(self, output="profile.collapsed", interval=0.001, sample_rate=0.01):
+        self.output = output
+        self.interval = interval
+        self.sample_rate = sample_rate
+        self.enabled = False
+        self.generation = 0
+        self.target_thread = None
+        self.stacks = Counter()
+        # label -> [calls, wall seconds, cpu seconds, slowest wall seconds]
+        self.calls = {}
+
+    def enable(self):
+        if self.enabled:
+            return
+        self.enabled = True
+        self.generation += 1
+        self.stacks = Counter()
+        self.calls = {}
+        self.target_thread = real_thread.get_ident()
+        real_thread.start_new_thread(self.run_sampler, (self.generation,))
+
+    def disable(self):
+        # The sampler thread notices, writes the output and exits.
+        self.enabled = False
+
+    def toggle(self, *_signal_args):
+        if self.enabled:
+            self.disable()
+        else:
+            self.enable()
+
+    def run_sampler(self, generation):
+        while self.enabled and self.generation == generation:
+            frame = sys._current_frames().get(self.target_thread)
+            if frame is not None and IDLE_MARKER not in frame.f_code.co_filename:
+                labels = []
+                while frame is not None:
+                    labels.append(frame_label(frame.f_code))
+                    frame = frame.f_back
+                self.stacks[";".join(reversed(labels))] += 1
+            real_time.sleep(self.interval)
+        if self.generation == generation:
+            self.write()
+
+    def record_call(self, label, wall, cpu):
+        entry = self.calls.get(label)
+        if entry is None:
+            entry = self.calls[label] = [0, 0.0, 0.0, 0.0]
+        entry[0] += 1
+        entry[1] += wall
+        entry[2] += cpu
+        entry[3] = max(entry[3], wall)
+
+    def profiled(self, label):
+        """Decorator recording wall and CPU time of a sample of calls."""
+        def decorator(function):
+            @functools.wraps(function)
+            def wrapper(*args, **kwargs):
+                if not self.enabled or random.random() >= self.sample_rate:
+                    return function(*args, **kwargs)
+                wall_started = time.perf_counter()
+                cpu_started = time.thread_time()
+                try:
+                    return function(*args, **kwargs)
+                finally:
+                    self.record_call(
+                        label,
+                        time.perf_counter() - wall_started,
+                        time.thread_time() - cpu_started,
+                    )
+
+            return wrapper
+
+        return decorator
+
+    def collapsed(self):
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+    def call_summary(self, top_frames=20):
+        lines = ["label\tcalls\twall_ms_avg\tcpu_ms_avg\twall_ms_max"]
+        for label, (calls, wall, cpu, slowest) in sorted(
+            dict(self.calls).items(), key=lambda item: -item[1][1]
+        ):
+            lines.append(
+                f"{label}\t{calls}\t{wall / calls * 1000:.3f}\t"
+                f"{cpu / calls * 1000:.3f}\t{slowest * 1000:.3f}"
+            )
+        leaves = Counter()
+        for stack, count in self.stacks.items():
+            leaves[stack.rsplit(";", 1)[-1]] += count
+        total = sum(leaves.values()) or 1
+        lines.append("")
+        lines.append("top frames\tsamples\tshare")
+        for leaf, count in leaves.most_common(top_frames):
+            lines.append(f"{leaf}\t{count}\t{count / total:.1%}")
+        return "\n".join(lines) + "\n"
+
+    def write(self):
+        with open(self.output, "w", encoding="utf-8") as handle:
+            handle.write(self.collapsed())
+        with open(self.output + ".calls", "w", encoding="utf-8") as handle:
+            handle.write(self.call_summary())
@@ -0,0 +1,71 @@
+"""Token buckets for throttling client events.
+
+A bucket holds up to ``burst`` tokens and refills at ``rate`` tokens per
+second; each allowed event takes one. Buckets are created on first use and
+kept in a plain dict, so the caller drops them with ``forget`` when their key
+(a sid or a lobby) goes away. Like the rest of the server state this relies
+on eventlet: no greenlet switch happens inside ``allow``.
+"""
+import time
+
+
+class RateLimiter:
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        # key -> [tokens, monotonic time of the last update]
+        self.buckets = {}
+
+    def allow(self, key):
+        now = time.monotonic()
+        bucket = self.buckets.get(key)
+        if bucket is None:
+            self.buckets[key] = [self.burst - 1, now]
+            return True
+        tokens = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+        bucket[1] = now
+        if tokens < 1:
+            bucket[0] = tokens
+            return False
+        bucket[0] = tokens - 1
+        return True
+
+    def forget(self, key):
+        self.buckets.pop(key, None)
+
+
+class EventLimits:
+    """Per-sid and per-lobby limiters for each throttled event.
+
+    ``limits`` maps an event name to ``(sid_limit, lobby_limit)``, each a
+    ``(rate, burst)`` pair or None for no limit at that level. An event that
+    maps to None is not limited at all.
+    """
+
+    def __init__(self, limits):
+        self.sid_limiters = {}
+        self.lobby_limiters = {}
+        for event_name, event_limits in limits.items():
+            if not event_limits:
+                continue
+            sid_limit, lobby_limit = event_limits
+            if sid_limit:
+                self.sid_limiters[event_name] = RateLimiter(*sid_limit)
+            if lobby_limit:
+                self.lobby_limiters[event_name] = RateLimiter(*lobby_limit)
+
+    def allow_sid(self, event_name, sid):
+        limiter = self.sid_limiters.get(event_name)
+        return limiter is None or limiter.allow(sid)
+
+    def allow_lobby(self, event_name, lobby_id):
+        limiter = self.lobby_limiters.get(event_name)
+        return limiter is None or limiter.allow(lobby_id)
+
+    def forget_sid(self, sid):
+        for limiter in self.sid_limiters.values():
+            limiter.forget(sid)
+
+    def forget_lobby(self, lobby_id):
+        for limiter in self.lobby_limiters.values():
+            limiter.forget(lobby_id)
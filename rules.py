@@ -0,0 +1,179 @@
+"""Round resolution over compact choice arrays.
+
+Choices are whole numbers from 0 to 100, so a round reduces to a 101-slot
+histogram: one pass over the players fills it, and the duplicate, 0/100,
+closest-to-target and exact-hit rules are then decided per value instead of
+per player. ``resolve_rounds`` does the same for many rounds at once with
+NumPy, when it is installed.
+"""
+import math
+
+try:
+    import numpy as np
+except ImportError:  # NumPy only speeds up batch evaluation.
+    np = None
+
+
+CHOICE_VALUES = 101
+TARGET_FACTOR = 0.8
+BASE_LOSS = 1
+EXACT_HIT_LOSS = 2
+DUPLICATE_PENALTY = 1
+# Eliminations after which each extra rule is in force.
+DUPLICATES_FROM = 1
+EXACT_HIT_FROM = 2
+COMBO_FROM = 3
+
+DUPLICATE_MESSAGE = "Duplicate choices were disqualified (-1 penalty)."
+COMBO_MESSAGE = "0/100 combo activated: player(s) with 100 win the round."
+EXACT_HIT_MESSAGE = "Exact target hit: all other players lose 2 points."
+
+
+def calculate_target(choices):
+    """Calculate the round target from the submitted choices."""
+    return target_from_total(sum(choices), len(choices))
+
+
+def target_from_total(total, count):
+    """The round target from the sum and number of submitted choices."""
+    if not count:
+        return 0.0
+    return total / count * TARGET_FACTOR
+
+
+def resolve_round(choices, elimination_count, target=None):
+    """Resolve one round from a sequence of choices.
+
+    ``None`` entries are players that did not submit; they can neither win
+    nor be disqualified. Returns a dict with the ``target``, ``base_loss``,
+    ``rule_messages`` and the indices into ``choices`` of the ``winners``,
+    the ``disqualified`` players and the ``exact_target_hitters``.
+    """
+    counts = [0] * CHOICE_VALUES
+    total = 0
+    submitted = 0
+    for choice in choices:
+        if choice is not None:
+            counts[choice] += 1
+            total += choice
+            submitted += 1
+    if target is None:
+        target = (total / submitted) * TARGET_FACTOR if submitted else 0.0
+
+    duplicates_rule = elimination_count >= DUPLICATES_FROM
+    rule_messages = []
+    valid_values = []
+    disqualified_values = set()
+    for value, count in enumerate(counts):
+        if not count:
+            continue
+        if duplicates_rule and count > 1:
+            disqualified_values.add(value)
+        else:
+            valid_values.append(value)
+    if disqualified_values:
+        rule_messages.append(DUPLICATE_MESSAGE)
+
+    winning_values = set()
+    if (
+        elimination_count >= COMBO_FROM
+        and valid_values
+        and valid_values[0] == 0
+        and valid_values[-1] == 100
+    ):
+        winning_values.add(100)
+        rule_messages.append(COMBO_MESSAGE)
+
+    if not winning_values:
+        closest_distance = None
+        for value in valid_values:
+            distance = abs(value - target)
+            if closest_distance is None or distance < closest_distance - 1e-9:
+                winning_values = {value}
+                closest_distance = distance
+            elif math.isclose(distance, closest_distance, rel_tol=1e-9, abs_tol=1e-6):
+                winning_values.add(value)
+
+    exact_values = set()
+    base_loss = BASE_LOSS
+    if elimination_count >= EXACT_HIT_FROM:
+        exact_values = {
+            value
+            for value in valid_values
+            if math.isclose(value, target, rel_tol=1e-9, abs_tol=1e-6)
+        }
+        if exact_values:
+            base_loss = EXACT_HIT_LOSS
+            rule_messages.append(EXACT_HIT_MESSAGE)
+
+    winners = []
+    disqualified = []
+    exact_target_hitters = []
+    for index, choice in enumerate(choices):
+        if choice is None:
+            continue
+        if choice in disqualified_values:
+            disqualified.append(index)
+        elif choice in winning_values:
+            winners.append(index)
+        if choice in exact_values:
+            exact_target_hitters.append(index)
+
+    return {
+        "target": target,
+        "winners": winners,
+        "disqualified": disqualified,
+        "exact_target_hitters": exact_target_hitters,
+        "base_loss": base_loss,
+        "rule_messages": rule_messages,
+    }
+
+
+def resolve_rounds(choices, elimination_counts):
+    """Resolve many full rounds at once with NumPy.
+
+    ``choices`` is an (rounds, players) integer array and
+    ``elimination_counts`` has one entry per round. Returns a dict of arrays:
+    ``targets``, ``base_loss`` and the (rounds, players) boolean masks
+    ``winners``, ``disqualified`` and ``exact_target_hitters``.
+    """
+    if np is None:
+        raise RuntimeError("Batch evaluation needs NumPy (pip install numpy).")
+    choices = np.asarray(choices, dtype=np.int64)
+    elimination_counts = np.asarray(elimination_counts, dtype=np.int64)
+    rounds, players = choices.shape
+
+    targets = (choices.sum(axis=1) / players) * TARGET_FACTOR
+    offsets = choices + CHOICE_VALUES * np.arange(rounds)[:, None]
+    counts = np.bincount(offsets.ravel(), minlength=rounds * CHOICE_VALUES).reshape(
+        rounds, CHOICE_VALUES
+    )
+    disqualified_values = (elimination_counts >= DUPLICATES_FROM)[:, None] & (counts > 1)
+    valid_values = (counts > 0) & ~disqualified_values
+
+    values = np.arange(CHOICE_VALUES)
+    distances = np.where(valid_values, np.abs(values[None, :] - targets[:, None]), np.inf)
+    closest = distances.min(axis=1)[:, None]
+    tolerance = np.maximum(1e-9 * np.maximum(distances, closest), 1e-6)
+    with np.errstate(invalid="ignore"):  # inf - inf when every value is disqualified
+        winning_values = valid_values & (np.abs(distances - closest) <= tolerance)
+
+    combo = (elimination_counts >= COMBO_FROM) & valid_values[:, 0] & valid_values[:, 100]
+    winning_values[combo] = values == 100
+
+    exact_tolerance = np.maximum(
+        1e-9 * np.maximum(np.abs(values[None, :]), np.abs(targets[:, None])), 1e-6
+    )
+    exact_values = (
+        (elimination_counts >= EXACT_HIT_FROM)[:, None]
+        & valid_values
+        & (np.abs(values[None, :] - targets[:, None]) <= exact_tolerance)
+    )
+
+    return {
+        "targets": targets,
+        "winners": np.take_along_axis(winning_values, choices, axis=1),
+        "disqualified": np.take_along_axis(disqualified_values, choices, axis=1),
+        "exact_target_hitters": np.take_along_axis(exact_values, choices, axis=1),
+        "base_loss": np.where(exact_values.any(axis=1), EXACT_HIT_LOSS, BASE_LOSS),
+    }
@@ -0,0 +1,67 @@
+"""Headless game engine: complete games in-process, without Socket.IO.
+
+Drives the same lobby functions as the server (``start_round``,
+``score_round``, ``check_winner``) on a lobby that is not registered in
+``app.lobbies``, so nothing is emitted and nothing waits on timers.
+
+    game = HeadlessGame(player_count=50)
+    winner = game.play()
+"""
+import time
+
+from app import (
+    check_winner,
+    create_bot_player,
+    generate_bot_choice,
+    new_lobby,
+    score_round,
+    set_player_choice,
+    start_round,
+)
+
+
+class HeadlessGame:
+    """One lobby of bots playing until a single player is left.
+
+    ``strategies`` is either one callable used for every seat or a sequence
+    of callables, one per seat. Each is called as ``strategy(lobby, player_id)``
+    and returns a whole number between 0 and 100, like ``generate_bot_choice``.
+    """
+
+    def __init__(self, player_count, strategies=None, lobby_id="HEADLESS"):
+        self.lobby_id = lobby_id
+        self.lobby = new_lobby()
+        self.lobby.state = "running"
+        if strategies is None:
+            strategies = generate_bot_choice
+        if callable(strategies):
+            strategies = [strategies] * player_count
+        self.strategies = {}
+        for seat in range(player_count):
+            player_id, _ = create_bot_player(self.lobby)
+            self.strategies[player_id] = strategies[seat]
+        self.evaluation_times = []
+
+    @property
+    def finished(self):
+        return self.lobby.state == "finished" or self.lobby.active_count <= 1
+
+    def play_round(self):
+        """Play one round and return its ``round_result`` payload."""
+        start_round(self.lobby)
+        for player_id, player in self.lobby.players.items():
+            if not player.eliminated:
+                set_player_choice(
+                    self.lobby, player, self.strategies[player_id](self.lobby, player_id)
+                )
+        started = time.perf_counter()
+        round_payload, _, _ = score_round(self.lobby_id, self.lobby)
+        self.evaluation_times.append(time.perf_counter() - started)
+        return round_payload
+
+    def play(self, max_rounds=1000):
+        """Play until the game ends and return the winner's name, if any."""
+        while not self.finished and self.lobby.round < max_rounds:
+            self.play_round()
+        winner = check_winner(self.lobby)
+        return winner.name if winner else None
@@ -56,6 +56,8 @@
       ? window.APP_CONFIG.socketUrl
       : "") || "";
   const initialLobbyCode = normalizeLobbyCode(lobbyFromQuery);
+  // ?watch=CODE follows a lobby as a spectator instead of joining it.
+  const watchLobbyCode = normalizeLobbyCode(urlParams.get("watch") || "");
   const inviteLockedLobbyId = initialLobbyCode || null;
   const socketTarget = serverFromQuery || configServerUrl || undefined;
   const socket = window.io ? window.io(socketTarget || undefined, { autoConnect: true }) : null;
@@ -185,8 +187,13 @@
     colorCursor: 0,
     latestWinners: new Set(),
     chatMessages: [],
+    chatLobbyId: null,
+    chatSeq: 0,
     typingPlayers: [],
     inviteLocked: Boolean(inviteLockedLobbyId),
+    lobbySnapshot: null,
+    lobbySyncPending: false,
+    spectating: Boolean(watchLobbyCode),
   };
 
   refreshRoundNumberLabel();
@@ -387,6 +394,7 @@
       playerId: entry.player_id || entry.playerId || null,
       message: text,
       timestamp,
+      seq: typeof entry.seq === "number" ? entry.seq : null,
     };
   }
 
@@ -1222,6 +1230,8 @@
       socket.emit("create_lobby", {
         player_name: state.playerName,
         client_id: state.clientId,
+        delta_updates: true,
+        encoding: "msgpack",
       });
     } else if (state.pendingAction.type === "join" && state.pendingAction.lobbyId) {
       emitJoinEvent(state.pendingAction.lobbyId);
@@ -1323,7 +1333,13 @@
     state.playerColors = new Map();
     state.colorCursor = 0;
     state.latestWinners = new Set();
-    state.chatMessages = [];
+    if (state.chatLobbyId !== lobbyId) {
+      state.chatMessages = [];
+      state.chatSeq = 0;
+      state.chatLobbyId = lobbyId;
+    }
+    state.lobbySnapshot = null;
+    state.lobbySyncPending = false;
     renderChatMessages(true);
     clearTypingIndicator();
     if (chatPanel) {
@@ -1343,9 +1359,26 @@
       lobby_id: targetLobbyId,
       player_name: state.playerName,
       client_id: state.clientId,
+      delta_updates: true,
+      encoding: "msgpack",
+      chat_since: targetLobbyId === state.chatLobbyId ? state.chatSeq : 0,
+      since_version:
+        targetLobbyId === state.lobbyId && state.lobbySnapshot
+          ? state.lobbySnapshot.version
+          : undefined,
     });
   }
 
+  function handleResumeSuccess() {
+    // The server kept our seat and sends only what changed since our
+    // snapshot, so keep the round state we already have.
+    state.pendingAction = null;
+    state.hasJoinedLobby = true;
+    setJoinButtonsDisabled(false);
+    setStatus(`Rejoined lobby "${state.lobbyId}".`);
+    setChatAvailability(true);
+  }
+
   joinForm.addEventListener("submit", (event) => {
     if (state.inviteLocked) {
       requestLobbyJoin(event);
@@ -1428,7 +1461,10 @@
     state.connected = true;
     state.socketId = socket.id;
     resetTypingSignal();
-    if (state.pendingAction) {
+    if (state.spectating) {
+      socket.emit("watch_lobby", { lobby_id: watchLobbyCode, encoding: "msgpack" });
+      setStatus(`Connecting to lobby ${watchLobbyCode} as a spectator…`);
+    } else if (state.pendingAction) {
       executePendingAction();
     } else if (state.playerName && state.lobbyId) {
       emitJoinEvent();
@@ -1488,19 +1524,44 @@
       setJoinButtonsDisabled(false);
       return;
     }
+    if (payload.resumed && lobbyId === state.lobbyId && state.hasJoinedLobby) {
+      handleResumeSuccess();
+      return;
+    }
     handleJoinSuccess(lobbyId);
   });
 
-  socket.on("chat_history", (payload = {}) => {
+  socket.on("watching_lobby", (payload = {}) => {
+    const lobbyId = normalizeLobbyCode(payload.lobby_id || "");
+    if (!lobbyId) {
+      return;
+    }
+    state.lobbyId = lobbyId;
+    if (joinScreen) {
+      joinScreen.classList.add("hidden");
+    }
+    updateLobbyCodeBanner();
+    setStatus(`Watching lobby ${lobbyId}.`);
+  });
+
+  onPayload("chat_history", (payload) => {
     const lobbyId = normalizeLobbyCode(payload.lobby_id || payload.lobbyId || "");
     if (!state.lobbyId || (lobbyId && lobbyId !== state.lobbyId)) {
       return;
     }
-    const incoming = Array.isArray(payload.messages) ? payload.messages : [];
-    state.chatMessages = incoming
+    const incoming = (Array.isArray(payload.messages) ? payload.messages : [])
       .map(normalizeChatMessage)
-      .filter(Boolean)
-      .slice(-CHAT_MESSAGE_LIMIT);
+      .filter(Boolean);
+    // A history "since" a sequence number only holds what this client missed.
+    const since = typeof payload.since === "number" ? payload.since : 0;
+    const base =
+      since > 0
+        ? state.chatMessages.filter((entry) => entry.seq === null || entry.seq <= since)
+        : [];
+    state.chatMessages = base.concat(incoming).slice(-CHAT_MESSAGE_LIMIT);
+    if (typeof payload.latest_seq === "number") {
+      state.chatSeq = payload.latest_seq;
+    }
     renderChatMessages(true);
     if (chatPanel) {
       chatPanel.classList.remove("hidden");
@@ -1519,6 +1580,9 @@
       return;
     }
     state.chatMessages.push(message);
+    if (message.seq !== null && message.seq > state.chatSeq) {
+      state.chatSeq = message.seq;
+    }
     if (state.chatMessages.length > CHAT_MESSAGE_LIMIT) {
       state.chatMessages = state.chatMessages.slice(-CHAT_MESSAGE_LIMIT);
     }
@@ -1535,6 +1599,32 @@
     renderTypingIndicator();
   });
 
+  socket.on("lobby_closed", (payload = {}) => {
+    const lobbyId = normalizeLobbyCode(payload.lobby_id || payload.lobbyId || "");
+    if (!state.lobbyId || (lobbyId && lobbyId !== state.lobbyId)) {
+      return;
+    }
+    const message = payload.message || `Lobby ${state.lobbyId} was closed.`;
+    state.hasJoinedLobby = false;
+    state.lobbyId = null;
+    state.pendingLobbyId = null;
+    state.chatLobbyId = null;
+    state.lobbySnapshot = null;
+    setGuessEnabled(false);
+    setChatAvailability(false);
+    clearTypingIndicator();
+    updateLobbyCodeBanner();
+    if (numberGridSection) {
+      numberGridSection.classList.add("hidden");
+    }
+    if (joinScreen) {
+      joinScreen.classList.remove("hidden");
+    }
+    setJoinButtonsDisabled(false);
+    joinHint.textContent = message;
+    setStatus(message);
+  });
+
   socket.on("error", (payload = {}) => {
     const message = payload.message || payload.error || "Server reported an error.";
     setResult(message, "negative");
@@ -1548,7 +1638,112 @@
     }
   });
 
-  socket.on("lobby_update", (payload = {}) => {
+  // Bulky events arrive as MessagePack (an ArrayBuffer) once the server has
+  // accepted `encoding: "msgpack"`; this reads the subset the server writes.
+  const utf8Decoder = new TextDecoder();
+
+  function decodeMsgpack(buffer) {
+    const bytes = new Uint8Array(buffer);
+    const view = new DataView(bytes.buffer, bytes.byteOffset, bytes.byteLength);
+    let offset = 0;
+
+    function readString(length) {
+      const text = utf8Decoder.decode(bytes.subarray(offset, offset + length));
+      offset += length;
+      return text;
+    }
+
+    function readArray(length) {
+      const items = new Array(length);
+      for (let index = 0; index < length; index += 1) {
+        items[index] = read();
+      }
+      return items;
+    }
+
+    function readMap(length) {
+      const result = {};
+      for (let index = 0; index < length; index += 1) {
+        const key = read();
+        result[key] = read();
+      }
+      return result;
+    }
+
+    function take(size, value) {
+      offset += size;
+      return value;
+    }
+
+    function read() {
+      const type = bytes[offset];
+      offset += 1;
+      if (type <= 0x7f) return type;
+      if (type <= 0x8f) return readMap(type & 0x0f);
+      if (type <= 0x9f) return readArray(type & 0x0f);
+      if (type <= 0xbf) return readString(type & 0x1f);
+      if (type >= 0xe0) return type - 0x100;
+      switch (type) {
+        case 0xc0: return null;
+        case 0xc2: return false;
+        case 0xc3: return true;
+        case 0xca: return take(4, view.getFloat32(offset));
+        case 0xcb: return take(8, view.getFloat64(offset));
+        case 0xcc: return take(1, view.getUint8(offset));
+        case 0xcd: return take(2, view.getUint16(offset));
+        case 0xce: return take(4, view.getUint32(offset));
+        case 0xcf: return take(8, Number(view.getBigUint64(offset)));
+        case 0xd0: return take(1, view.getInt8(offset));
+        case 0xd1: return take(2, view.getInt16(offset));
+        case 0xd2: return take(4, view.getInt32(offset));
+        case 0xd3: return take(8, Number(view.getBigInt64(offset)));
+        case 0xd9: return readString(take(1, view.getUint8(offset)));
+        case 0xda: return readString(take(2, view.getUint16(offset)));
+        case 0xdb: return readString(take(4, view.getUint32(offset)));
+        case 0xdc: return readArray(take(2, view.getUint16(offset)));
+        case 0xdd: return readArray(take(4, view.getUint32(offset)));
+        case 0xde: return readMap(take(2, view.getUint16(offset)));
+        case 0xdf: return readMap(take(4, view.getUint32(offset)));
+        default:
+          throw new Error(`Unsupported MessagePack type 0x${type.toString(16)}`);
+      }
+    }
+
+    return read();
+  }
+
+  function onPayload(eventName, handler) {
+    socket.on(eventName, (payload) => {
+      const isBinary = payload instanceof ArrayBuffer || ArrayBuffer.isView(payload);
+      handler(isBinary ? decodeMsgpack(payload) : payload || {});
+    });
+  }
+
+  function mergeLobbyDelta(snapshot, delta) {
+    const players = new Map(
+      (Array.isArray(snapshot.players) ? snapshot.players : []).map((player) => [player.id, player]),
+    );
+    (Array.isArray(delta.removed) ? delta.removed : []).forEach((id) => players.delete(id));
+    (Array.isArray(delta.players) ? delta.players : []).forEach((entry) => {
+      players.set(entry.id, { ...(players.get(entry.id) || {}), ...entry });
+    });
+    return {
+      ...snapshot,
+      ...(delta.fields || {}),
+      players: Array.from(players.values()),
+      version: delta.version,
+    };
+  }
+
+  function requestLobbySync() {
+    if (state.lobbySyncPending || !state.lobbyId) {
+      return;
+    }
+    state.lobbySyncPending = true;
+    socket.emit("request_lobby_sync", { lobby_id: state.lobbyId });
+  }
+
+  function applyLobbyUpdate(payload = {}) {
     const players = Array.isArray(payload.players) ? payload.players : payload;
     updatePlayersList(players, { persist: true });
     syncHostRole(payload);
@@ -1582,7 +1777,8 @@
       state.lobbyState === "running" &&
       state.awaitingChoices &&
       !state.hasSubmitted &&
-      !state.isEliminated
+      !state.isEliminated &&
+      !state.spectating
     ) {
       setGuessEnabled(true);
       setStatus("Round in progress. Make your guess!");
@@ -1598,9 +1794,38 @@
     ) {
       emitPlayerReady("waiting-state");
     }
+  }
+
+  onPayload("lobby_update", (payload) => {
+    const lobbyId = normalizeLobbyCode(payload.lobby_id || "");
+    if (state.lobbyId && lobbyId && lobbyId !== state.lobbyId) {
+      return;
+    }
+    if (typeof payload.version === "number") {
+      state.lobbySnapshot = payload;
+      state.lobbySyncPending = false;
+    }
+    applyLobbyUpdate(payload);
   });
 
-  socket.on("game_started", (payload = {}) => {
+  onPayload("lobby_delta", (delta) => {
+    const lobbyId = normalizeLobbyCode(delta.lobby_id || "");
+    if (state.lobbyId && lobbyId && lobbyId !== state.lobbyId) {
+      return;
+    }
+    const snapshot = state.lobbySnapshot;
+    if (snapshot && typeof delta.version === "number" && delta.version <= snapshot.version) {
+      return;
+    }
+    if (!snapshot || delta.base_version !== snapshot.version) {
+      requestLobbySync();
+      return;
+    }
+    state.lobbySnapshot = mergeLobbyDelta(snapshot, delta);
+    applyLobbyUpdate(state.lobbySnapshot);
+  });
+
+  onPayload("game_started", (payload) => {
     state.hasSubmitted = false;
     state.roundActive = true;
     state.awaitingNextRound = false;
@@ -1612,7 +1837,7 @@
     state.roundNumber = typeof payload.round === "number" ? payload.round : state.roundNumber + 1;
     resetRoundBreakdown();
     state.selectedNumber = null;
-    setGuessEnabled(true);
+    setGuessEnabled(!state.spectating);
 
     updateRoundDetails(payload);
     if (payload.players) {
@@ -1626,11 +1851,15 @@
     }
 
     const roundLabel = state.roundNumber || payload.round || 1;
-    setStatus(`Round ${roundLabel} has started! Submit your guess.`);
+    const timeLimit =
+      typeof payload.time_limit === "number" && payload.time_limit > 0
+        ? ` You have ${Math.round(payload.time_limit)} seconds.`
+        : "";
+    setStatus(`Round ${roundLabel} has started! Submit your guess.${timeLimit}`);
     setResult("Round in progress. Make your guess!", "info");
   });
 
-  socket.on("round_result", (payload = {}) => {
+  onPayload("round_result", (payload) => {
     state.hasSubmitted = false;
     state.roundActive = false;
     state.awaitingNextRound = Boolean(payload.awaiting_next_round);
@@ -1672,6 +1901,11 @@
       tone = "negative";
     }
 
+    if (Array.isArray(payload.timed_out) && payload.timed_out.includes(state.playerName)) {
+      message = "Time ran out before you submitted a guess.";
+      tone = "negative";
+    }
+
     const waitingStatus = state.awaitingNextRound
       ? state.isHost
         ? "Round complete. Start the next round when you're ready."